@@ -0,0 +1,44 @@
+"""
+Cost of reading nested hw4.Advert attributes in a loop.
+
+Run from the repository root:
+    python -m benchmarks.advert_attrs --reads 1000000
+"""
+import argparse
+import time
+
+from hw4 import Advert
+
+LISTING = {
+    'title': 'iPhone X',
+    'price': 100,
+    'location': {
+        'address': 'город Самара, улица Мориса Тореза, 50',
+        'metro_stations': ['Спортивная', 'Гагаринская'],
+        'district': {'name': 'Октябрьский', 'parts': [{'id': 1}, {'id': 2}]},
+    },
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--reads', type=int, default=1000000)
+    args = parser.parse_args()
+
+    ad = Advert(LISTING)
+    cases = {
+        'location.metro_stations': lambda: ad.location.metro_stations,
+        'location.district.parts': lambda: ad.location.district.parts,
+        'rebuild on every read': lambda: Advert.build(ad.data['location']).metro_stations,
+    }
+    print('{:<26}|{:>12}'.format('attribute', 'ns/read'))
+    for name, read in cases.items():
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            read()
+        elapsed = time.perf_counter() - start
+        print(f'{name:<26}|{elapsed / args.reads * 1e9:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of str() on a large roster of cw2.EmojiMixin subclasses with a big ICON table.
+
+Run from the repository root:
+    python -m benchmarks.emoji_render --pokemons 100000 --icons 300 --names 1000
+"""
+import argparse
+import random
+import time
+
+from cw2 import EmojiMixin
+
+
+def make_icons(n_icons: int) -> dict:
+    icons = dict(EmojiMixin.ICON)
+    for i in range(len(icons), n_icons):
+        icons[f'type{i:04d}'] = chr(0x1F400 + i % 256)
+    return icons
+
+
+def replace_each(icons: dict):
+    """Прежняя замена: text.replace для каждого слова ICON"""
+    def replace(text: str) -> str:
+        for word, emoji in icons.items():
+            replaced = text.replace(word, emoji)
+            if replaced != text:
+                return replaced
+        return text
+    return replace
+
+
+def make_class(icons: dict, cache_size: int = 0) -> type:
+    """Класс покемона с данной таблицей ICON, наследуется прямо от EmojiMixin"""
+    class Roster(EmojiMixin):
+        ICON = icons
+        STR_CACHE_SIZE = cache_size
+
+        def __init__(self, name: str, poketype: str):
+            self.name = name
+            self.poketype = poketype
+
+        def __str__(self):
+            return f'{self.name}/{self.poketype}'
+    return Roster
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pokemons', type=int, default=100000)
+    parser.add_argument('--icons', type=int, default=300)
+    parser.add_argument('--names', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    icons = make_icons(args.icons)
+    words = list(icons) + ['normal', 'ghost']
+    rng = random.Random(args.seed)
+    roster = [(f'Pokemon{rng.randrange(args.names)}', rng.choice(words)) for _ in range(args.pokemons)]
+    compiled = make_class(icons)
+    cached = make_class(icons, cache_size=4096)
+    loop = replace_each(icons)
+    cases = {
+        'replace per icon': lambda name, poketype: loop(f'{name}/{poketype}'),
+        'compiled regex': lambda name, poketype: str(compiled(name, poketype)),
+        'compiled + lru cache': lambda name, poketype: str(cached(name, poketype)),
+    }
+    print('{:<22}|{:>12}'.format('engine', 'us/str'))
+    for name, render in cases.items():
+        start = time.perf_counter()
+        for pokemon in roster:
+            render(*pokemon)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<22}|{elapsed / len(roster) * 1e6:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
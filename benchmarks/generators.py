@@ -0,0 +1,98 @@
+"""
+Seeded synthetic data for the benchmarks: text corpora, Corp_Summary csv files,
+nested JSON ad feeds and RGB pixels.
+"""
+import csv
+import json
+import random
+
+
+def make_corpus(n_docs: int, n_words: int = 50000, doc_len: int = 30, seed: int = 0) -> list[str]:
+    """
+    Generate a corpus with Zipf-distributed words
+    :param n_docs: number of sentences
+    :param n_words: vocabulary size
+    :param doc_len: number of words per sentence
+    :param seed: random seed
+    :return: list of strings
+    """
+    rng = random.Random(seed)
+    words = [f'w{i}' for i in range(n_words)]
+    weights = [1 / rank for rank in range(1, n_words + 1)]
+    return [' '.join(rng.choices(words, weights, k=doc_len)) for _ in range(n_docs)]
+
+
+def write_corp_summary(path: str, n_rows: int, n_departments: int = 20, n_teams: int = 5, seed: int = 0) -> str:
+    """
+    Generate a Corp_Summary.csv file with the columns hw2 reads
+    :param path: path to the csv file
+    :param n_rows: number of employees
+    :param n_departments: number of departments
+    :param n_teams: number of teams in every department
+    :param seed: random seed
+    :return: path to the csv file
+    """
+    rng = random.Random(seed)
+    positions = ['Инженер', 'Аналитик', 'Менеджер', 'Дизайнер', 'Тестировщик']
+    with open(path, 'w', encoding='UTF-8', newline='') as csv_file:
+        writer = csv.writer(csv_file, delimiter=';')
+        writer.writerow(['ФИО полностью', 'Должность', 'Департамент', 'Отдел', 'Оценка', 'Оклад'])
+        for i in range(n_rows):
+            department = rng.randrange(n_departments)
+            writer.writerow([f'Сотрудник {i}', rng.choice(positions), f'Департамент {department}',
+                             f'Отдел {department}.{rng.randrange(n_teams)}', rng.choice([3, 3.5, 4, 4.5, 5]),
+                             int(rng.lognormvariate(11.5, 0.4))])
+    return path
+
+
+def make_ads(n_ads: int, depth: int = 2, bad_price_share: float = 0.0, seed: int = 0) -> list[dict]:
+    """
+    Generate nested ads in the format of hw4.Advert
+    :param n_ads: number of ads
+    :param depth: nesting depth of the location field
+    :param bad_price_share: share of ads with a negative price
+    :param seed: random seed
+    :return: list of dictionaries
+    """
+    rng = random.Random(seed)
+    ads = []
+    for i in range(n_ads):
+        location = {'address': f'город Самара, улица {rng.randrange(500)}, {rng.randrange(100)}',
+                    'metro_stations': rng.sample(['Спортивная', 'Гагаринская', 'Московская', 'Победа'], 2)}
+        for level in range(depth - 1):
+            location = {'name': f'район {level}', 'parts': [{'id': part} for part in range(3)], 'inner': location}
+        price = rng.randrange(1, 100000) * (-1 if rng.random() < bad_price_share else 1)
+        ads.append({'title': f'Объявление {i}', 'price': price, 'class': rng.choice(['dogs', 'phones', 'cars']),
+                    'location': location})
+    return ads
+
+
+def write_ad_feed(path: str, ads: list[dict], json_array: bool = False) -> str:
+    """
+    Save ads as JSON Lines or as a JSON array
+    :param path: path to the feed
+    :param ads: ads from make_ads
+    :param json_array: save one JSON array instead of one ad per line
+    :return: path to the feed
+    """
+    with open(path, 'w', encoding='UTF-8') as feed:
+        if json_array:
+            json.dump(ads, feed, ensure_ascii=False)
+        else:
+            feed.writelines(json.dumps(ad, ensure_ascii=False) + '\n' for ad in ads)
+    return path
+
+
+def make_pixels(n_pixels: int, n_colors: int = 256, run_length: int = 1, seed: int = 0) -> bytes:
+    """
+    Generate packed RGB pixels in the format of cw3.ColorArray
+    :param n_pixels: number of pixels
+    :param n_colors: size of the palette the pixels are taken from
+    :param run_length: number of equal pixels in a row
+    :param seed: random seed
+    :return: bytes with three channels per pixel
+    """
+    rng = random.Random(seed)
+    palette = [rng.randbytes(3) for _ in range(n_colors)]
+    runs = -(-n_pixels // run_length)
+    return b''.join(rng.choice(palette) * run_length for _ in range(runs))[:3 * n_pixels]
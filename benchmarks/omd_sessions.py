@@ -0,0 +1,73 @@
+"""
+Throughput of scripted omd story sessions over every path through the story.
+
+Run from the repository root:
+    python -m benchmarks.omd_sessions --sessions 1000000
+"""
+import argparse
+import io
+import sys
+import time
+from itertools import cycle, islice
+
+from omd import StoryGraph, StorySession, iter_paths, run_story
+
+
+def replay_sessions(graph, scripts):
+    """Сессии напрямую через StorySession, возвращает число шагов"""
+    steps = 0
+    session = StorySession(graph)
+    for script in scripts:
+        session.start()
+        for answer in script:
+            session.feed(answer)
+        steps += len(script) + 1
+    return steps
+
+
+def replay_streams(graph, scripts):
+    """Сессии через run_story с потоками в памяти, возвращает число шагов"""
+    steps = 0
+    for script in scripts:
+        run_story(graph, io.StringIO(''.join(answer + '\n' for answer in script)), io.StringIO())
+        steps += len(script) + 1
+    return steps
+
+
+def retained_blocks_per_step(graph, scripts):
+    """Сколько блоков памяти остается живым после шага (возвращенные строки), а не сколько выделено за шаг"""
+    session = StorySession(graph)
+    blocks = steps = 0
+    for script in scripts:
+        before = sys.getallocatedblocks()
+        lines = session.start()
+        blocks += sys.getallocatedblocks() - before
+        for answer in script:
+            del lines
+            before = sys.getallocatedblocks()
+            lines = session.feed(answer)
+            blocks += sys.getallocatedblocks() - before
+        del lines
+        steps += len(script) + 1
+    return blocks / steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=200000)
+    args = parser.parse_args()
+
+    graph = StoryGraph.from_file()
+    paths = list(iter_paths(graph))
+    print(f'paths: {len(paths)}, retained blocks/step: {retained_blocks_per_step(graph, paths * 10):.2f}')
+    cases = {'session': replay_sessions, 'streams': replay_streams}
+    print('{:<10}|{:>12}|{:>14}'.format('driver', 'sessions/s', 'steps/s'))
+    for name, replay in cases.items():
+        start = time.perf_counter()
+        steps = replay(graph, islice(cycle(paths), args.sessions))
+        elapsed = time.perf_counter() - start
+        print(f'{name:<10}|{args.sessions / elapsed:>12.0f}|{steps / elapsed:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
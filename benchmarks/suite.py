@@ -0,0 +1,176 @@
+"""
+Time and peak memory of every module's main workload across a sweep of input sizes.
+
+Run from the repository root:
+    python -m benchmarks.suite --out results.json --scales 1 4 16
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from benchmarks.generators import make_ads, make_corpus, make_pixels, write_ad_feed, write_corp_summary
+from cw1 import CountVectorizer, TfidfVectorizer
+from cw3 import Color, ColorArray, ColorRenderer
+from hw2 import CorpReport
+from hw4 import Advert, load_adverts
+
+
+def count_vectorizer(size: int, directory: str) -> Callable[[], object]:
+    corpus = make_corpus(size, n_words=5000, doc_len=20)
+    return lambda: CountVectorizer(sparse=True).fit_transform(corpus)
+
+
+def tfidf_vectorizer(size: int, directory: str) -> Callable[[], object]:
+    corpus = make_corpus(size, n_words=5000, doc_len=20)
+    return lambda: TfidfVectorizer(sparse=True).fit_transform(corpus)
+
+
+def corp_report(size: int, directory: str) -> Callable[[], object]:
+    path = write_corp_summary(os.path.join(directory, f'corp_{size}.csv'), size)
+    return lambda: CorpReport.from_csv(path).summary(percentiles=(90,))
+
+
+def advert_feed(size: int, directory: str) -> Callable[[], object]:
+    path = write_ad_feed(os.path.join(directory, f'ads_{size}.jsonl'), make_ads(size, bad_price_share=0.01))
+    return lambda: sum(1 for _ in load_adverts(path, on_error=lambda index, error: None))
+
+
+def compiled_advert_feed(size: int, directory: str) -> Callable[[], object]:
+    ads = make_ads(size, bad_price_share=0.01)
+    path = write_ad_feed(os.path.join(directory, f'ads_{size}.json'), ads, json_array=True)
+    compiled = Advert.compile(ads[0])
+    return lambda: sum(1 for _ in load_adverts(path, cls=compiled, on_error=lambda index, error: None))
+
+
+def color_array(size: int, directory: str) -> Callable[[], object]:
+    pixels = ColorArray(make_pixels(size))
+    return lambda: ((pixels * 0.5 + Color(10, 20, 30)) + pixels).unique()
+
+
+def color_render(size: int, directory: str) -> Callable[[], object]:
+    data = make_pixels(size, run_length=4)
+    rows = [ColorArray(data[i:i + 3 * 200]) for i in range(0, len(data), 3 * 200)]
+    return lambda: ColorRenderer(io.StringIO()).draw(rows)
+
+
+WORKLOADS = {
+    'count_vectorizer': (count_vectorizer, 2000),
+    'tfidf_vectorizer': (tfidf_vectorizer, 2000),
+    'corp_report': (corp_report, 20000),
+    'advert_feed': (advert_feed, 2000),
+    'compiled_advert_feed': (compiled_advert_feed, 2000),
+    'color_array': (color_array, 100000),
+    'color_render': (color_render, 20000),
+}
+
+
+def measure(run: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """
+    Best time of several runs and peak memory of a separate run under tracemalloc
+    :param run: workload prepared by its setup function
+    :param repeat: number of timed runs
+    :return: seconds and peak bytes
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(names: list[str], scales: list[int], repeat: int) -> dict:
+    """
+    Run the workloads for every scale of their base size
+    :return: machine-readable results
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            setup, base_size = WORKLOADS[name]
+            for scale in scales:
+                size = base_size * scale
+                seconds, peak = measure(setup(size, directory), repeat)
+                results.append({'workload': name, 'size': size, 'seconds': seconds, 'peak_bytes': peak})
+                print(f'{name:<22}|{size:>10}|{seconds:>10.4f}|{peak / 2 ** 20:>10.2f}')
+    return {
+        'commit': git_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(before: dict, after: dict, threshold: float) -> int:
+    """
+    Print time and memory ratios of two result files
+    :param threshold: relative growth that counts as a regression
+    :return: number of regressions
+    """
+    old = {(row['workload'], row['size']): row for row in before['results']}
+    print(f'{str(before["commit"])[:10]} -> {str(after["commit"])[:10]}')
+    print('{:<22}|{:>10}|{:>10}|{:>10}'.format('workload', 'size', 'time', 'memory'))
+    regressions = 0
+    for row in after['results']:
+        previous = old.get((row['workload'], row['size']))
+        if previous is None:
+            continue
+        ratios = [row[key] / previous[key] if previous[key] else 1.0 for key in ('seconds', 'peak_bytes')]
+        marks = ['!' if ratio > 1 + threshold else ' ' for ratio in ratios]
+        regressions += marks.count('!')
+        print(f'{row["workload"]:<22}|{row["size"]:>10}|{ratios[0]:>8.2f}x{marks[0]}|{ratios[1]:>8.2f}x{marks[1]}')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--only', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', help='path to save the results as json')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative growth reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            sys.exit(1 if compare(json.load(before), json.load(after), args.threshold) else 0)
+
+    print('{:<22}|{:>10}|{:>10}|{:>10}'.format('workload', 'size', 'seconds', 'peak MiB'))
+    results = run_suite(args.only, args.scales, args.repeat)
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(results, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Scaling of TfidfVectorizer.fit_transform with the number of processes.
+
+Run from the repository root:
+    python -m benchmarks.tfidf_parallel --docs 200000 --jobs 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.generators import make_corpus
+from cw1 import TfidfVectorizer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--jobs', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs)
+    print(f'{args.docs} documents, {os.cpu_count()} cores')
+    print('{:>6}|{:>10}|{:>9}'.format('n_jobs', 'seconds', 'speedup'))
+    baseline = None
+    for n_jobs in args.jobs:
+        start = time.perf_counter()
+        TfidfVectorizer(sparse=True, n_jobs=n_jobs).fit_transform(corpus)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f'{n_jobs:>6}|{elapsed:>10.3f}|{baseline / elapsed:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,244 @@
+import bisect
+import heapq
+import json
 import math
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
 from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat, zip_longest
+from operator import itemgetter, mul, sub, truediv
+from typing import Callable
+
+# a corpus is an iterable of sentences or an os.PathLike path to a file with one
+# sentence per line, a bare str is neither and is rejected by iter_corpus
+Corpus = Iterable[str] | os.PathLike
+TOKEN_PATTERN = r'\w+'
+
+
+class Tokenizer:
+    """Split a sentence into words or character n-grams."""
+    ANALYZERS = ('word', 'char')
+
+    def __init__(self, token_pattern: str = TOKEN_PATTERN, lowercase: bool = True,
+                 stop_words: Iterable[str] | None = None, ngram_range: tuple[int, int] = (1, 1),
+                 analyzer: str = 'word'):
+        """
+        :param token_pattern: regular expression matching a single word
+        :param lowercase: convert sentence to lowercase before tokenization
+        :param stop_words: words to drop before building n-grams
+        :param ngram_range: (min_n, max_n) lengths of n-grams to produce
+        :param analyzer: 'word' for word n-grams, 'char' for character n-grams
+        """
+        if analyzer not in self.ANALYZERS:
+            raise ValueError(f"Analyzer must be one of {self.ANALYZERS}")
+        if not 1 <= ngram_range[0] <= ngram_range[1]:
+            raise ValueError("ngram_range must satisfy 1 <= min_n <= max_n")
+        self.token_pattern = re.compile(token_pattern)
+        self.lowercase = lowercase
+        self.stop_words = frozenset(stop_words or ())
+        self.ngram_range = tuple(ngram_range)
+        self.analyzer = analyzer
+
+    def __call__(self, sentence: str) -> list[str]:
+        """
+        Tokenize a sentence
+        :param sentence: string
+        :return: list of tokens
+        """
+        if self.lowercase:
+            sentence = sentence.lower()
+        if self.analyzer == 'char':
+            return self._ngrams(' '.join(sentence.split()), '')
+        tokens = self.token_pattern.findall(sentence)
+        if self.stop_words:
+            tokens = [token for token in tokens if token not in self.stop_words]
+        return self._ngrams(tokens, ' ')
+
+    def get_params(self) -> dict:
+        """
+        Return parameters of the tokenizer
+        :return: keyword arguments to build an equal Tokenizer
+        """
+        return {'token_pattern': self.token_pattern.pattern, 'lowercase': self.lowercase,
+                'stop_words': sorted(self.stop_words), 'ngram_range': list(self.ngram_range),
+                'analyzer': self.analyzer}
+
+    def _ngrams(self, tokens: list[str] | str, sep: str) -> list[str]:
+        """N-grams of tokens joined by sep"""
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return list(tokens)
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            ngrams.extend(sep.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+
+def prunes(min_df: int | float = 1, max_df: int | float = 1.0, max_features: int | None = None) -> bool:
+    """
+    Whether limit_features may drop columns with these parameters, only the
+    defaults int min_df=1 and float max_df=1.0 are known to keep every word
+    :param min_df: int or float as in limit_features
+    :param max_df: int or float as in limit_features
+    :param max_features: maximum number of words or None
+    :return: True if pruning is configured
+    """
+    return not (type(min_df) is int and min_df == 1) \
+        or not (type(max_df) is float and max_df == 1.0) or max_features is not None
+
+
+def limit_features(doc_freq: list[int], term_freq: list[int] | None, n_docs: int,
+                   min_df: int | float = 1, max_df: int | float = 1.0,
+                   max_features: int | None = None) -> list[int]:
+    """
+    Select columns to keep in the vocabulary
+    :param doc_freq: number of documents containing each word
+    :param term_freq: total count of each word, required with max_features
+    :param n_docs: number of documents
+    :param min_df: drop words found in fewer documents, float is a fraction of n_docs
+    :param max_df: drop words found in more documents, float is a fraction of n_docs
+    :param max_features: keep only this many most frequent words
+    :return: sorted list of kept column indices
+    """
+    if isinstance(min_df, float):
+        min_df = math.ceil(min_df * n_docs)
+    if isinstance(max_df, float):
+        max_df = math.floor(max_df * n_docs)
+    kept = [j for j, freq in enumerate(doc_freq) if min_df <= freq <= max_df]
+    if max_features is not None and len(kept) > max_features:
+        kept = sorted(sorted(kept, key=lambda j: -term_freq[j])[:max_features])
+    return kept
+
+
+class CsrMatrix:
+    """Sparse matrix in compressed sparse row (CSR) format."""
+
+    def __init__(self, indptr: array, indices: array, data: array, shape: tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+
+    @classmethod
+    def from_dense(cls, matrix: list[list]) -> 'CsrMatrix':
+        """
+        Build a CSR matrix from a dense matrix
+        :param matrix: list of rows
+        :return: CsrMatrix with the non-zero cells of matrix
+        """
+        is_float = any(isinstance(value, float) for row in matrix for value in row)
+        indptr, indices, data = array('q', [0]), array('i'), array('d' if is_float else 'q')
+        for row in matrix:
+            for j, value in enumerate(row):
+                if value:
+                    indices.append(j)
+                    data.append(value)
+            indptr.append(len(indices))
+        n_cols = len(matrix[0]) if matrix else 0
+        return cls(indptr, indices, data, (len(matrix), n_cols))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in range(self.shape[0]):
+            yield self.getrow(i)
+
+    @property
+    def dtype(self) -> str:
+        """Type code of stored values, data may be an array or a memoryview"""
+        return getattr(self.data, 'typecode', None) or self.data.format
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored non-zero values"""
+        return len(self.data)
+
+    def row_lengths(self):
+        """Number of non-zero cells in each row"""
+        return map(sub, self.indptr[1:], self.indptr)
+
+    def row_l1_norms(self) -> list:
+        """Sum of absolute values in each row"""
+        data = self.data
+        return [sum(map(abs, data[start:end])) for start, end in zip(self.indptr, self.indptr[1:])]
+
+    def select_columns(self, columns: list[int]) -> 'CsrMatrix':
+        """
+        Keep only the given columns, renumbered in the given order
+        :param columns: indices of columns to keep
+        :return: new CsrMatrix
+        """
+        mapping = dict(zip(columns, range(len(columns))))
+        indptr, indices, data = array('q', [0]), array('i'), array(self.dtype)
+        for row_indices, row_data in self:
+            for j, value in zip(row_indices, row_data):
+                idx = mapping.get(j)
+                if idx is not None:
+                    indices.append(idx)
+                    data.append(value)
+            indptr.append(len(indices))
+        return CsrMatrix(indptr, indices, data, (self.shape[0], len(columns)))
+
+    def _get_state(self) -> tuple[dict, dict]:
+        """Parameters and buffers to save"""
+        return {'shape': self.shape}, {'indptr': self.indptr, 'indices': self.indices, 'data': self.data}
+
+    @classmethod
+    def _from_state(cls, meta: dict, arrays: dict) -> 'CsrMatrix':
+        """Restore matrix saved by _get_state"""
+        return cls(arrays['indptr'], arrays['indices'], arrays['data'], tuple(meta['shape']))
+
+    def getrow(self, i: int) -> tuple[array, array]:
+        """
+        Return column indices and values of non-zero cells in row i
+        :param i: row number
+        :return: (indices, data) of the row
+        """
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def toarray(self) -> list[list]:
+        """
+        Convert to a dense matrix
+        :return: list of rows
+        """
+        zero = 0.0 if self.dtype == 'd' else 0
+        matrix = []
+        for indices, data in self:
+            row = [zero] * self.shape[1]
+            for j, value in zip(indices, data):
+                row[j] = value
+            matrix.append(row)
+        return matrix
 
 
 class CountVectorizer:
     """Convert a text corpus to a matrix of words counts."""
 
-    def __init__(self):
+    def __init__(self, sparse: bool = False, tokenizer: Callable[[str], list[str]] | None = None,
+                 min_df: int | float = 1, max_df: int | float = 1.0, max_features: int | None = None):
+        """
+        :param sparse: return CsrMatrix instead of a dense matrix
+        :param tokenizer: callable splitting a sentence into tokens, Tokenizer() by default
+        :param min_df: drop words found in fewer documents, float is a fraction of corpus
+        :param max_df: drop words found in more documents, float is a fraction of corpus
+        :param max_features: keep only this many most frequent words
+        Vocabulary pruning is applied by fit and fit_transform, not by partial_fit
+        """
         self.feature_names = {}
+        self.sparse = sparse
+        self.tokenizer = tokenizer or Tokenizer()
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
 
     def get_feature_names(self) -> list[str]:
         """
@@ -15,96 +247,806 @@ class CountVectorizer:
         """
         return list(self.feature_names)
 
-    def set_feature_names(self, corpus: list[str]) -> dict[str, int]:
+    def set_feature_names(self, corpus: Corpus) -> dict[str, int]:
         """
         Retrieves a list of unique words from text corpus
-        :param corpus: list of strings
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
         :return: list of words
         """
-        idx = 0
-        for sentence in corpus:
-            sentence = sentence.lower().split(' ')
+        if not isinstance(self.feature_names, dict):
+            self.feature_names = dict(self.feature_names)
+        idx = len(self.feature_names)
+        for sentence in iter_corpus(corpus):
+            sentence = self.tokenizer(sentence)
             for word in sentence:
                 if word not in self.feature_names:
                     self.feature_names[word] = idx
                     idx += 1
         return self.feature_names
 
-    def fit_transform(self, corpus: list[str]) -> list[list[int]]:
+    def fit(self, corpus: Corpus) -> 'CountVectorizer':
+        """
+        Learn vocabulary from corpus, the previous vocabulary is discarded
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: fitted vectorizer
+        """
+        if prunes(self.min_df, self.max_df, self.max_features):
+            self.fit_transform(corpus)
+            return self
+        self.feature_names = {}
+        self.set_feature_names(corpus)
+        return self
+
+    def partial_fit(self, corpus: Corpus) -> 'CountVectorizer':
+        """
+        Extend vocabulary with new words from corpus,
+        existing words keep their columns
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: fitted vectorizer
+        """
+        self.set_feature_names(corpus)
+        return self
+
+    def transform(self, corpus: Corpus) -> list[list[int]] | CsrMatrix:
+        """
+        Generate count matrix with the learned vocabulary,
+        words missing from the vocabulary are ignored
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: count matrix for corpus, CsrMatrix if sparse=True
+        """
+        return self._format(self._count(iter_corpus(corpus)))
+
+    def iter_transform(self, corpus: Corpus, chunk_size: int = 10000):
+        """
+        Lazily generate count matrix with the learned vocabulary chunk by chunk,
+        only one chunk of sentences is held in memory at a time
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :param chunk_size: number of sentences per chunk
+        :return: generator of count matrices, CsrMatrix if sparse=True
+        """
+        for chunk in iter_chunks(iter_corpus(corpus), chunk_size):
+            yield self._format(self._count(chunk))
+
+    def fit_transform(self, corpus: Corpus) -> list[list[int]] | CsrMatrix:
         """
         Generate count matrix, each row corresponds to sentence in corpus,
-        each column corresponds to unique words from corpus
-        :param corpus: list of strings
+        each column corresponds to unique words from corpus.
+        Vocabulary and counts are built in a single pass over corpus
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: count matrix for corpus, CsrMatrix if sparse=True
+        """
+        self.feature_names = {}
+        count_matrix = self._count(iter_corpus(corpus), grow=True)
+        if prunes(self.min_df, self.max_df, self.max_features):
+            count_matrix, _ = self._limit_features(count_matrix)
+        return self._format(count_matrix)
+
+    def _get_params(self) -> dict:
+        """Constructor arguments except tokenizer"""
+        return {'sparse': self.sparse, 'min_df': self.min_df,
+                'max_df': self.max_df, 'max_features': self.max_features}
+
+    def _get_state(self) -> tuple[dict, dict]:
+        """Parameters and buffers to save"""
+        meta = {'params': self._get_params(), 'tokenizer': _tokenizer_params(self.tokenizer)}
+        return meta, _vocabulary_to_arrays(self.feature_names)
+
+    @classmethod
+    def _from_state(cls, meta: dict, arrays: dict) -> 'CountVectorizer':
+        """Restore vectorizer saved by _get_state"""
+        vectorizer = cls(tokenizer=Tokenizer(**meta['tokenizer']), **meta['params'])
+        vectorizer.feature_names = _vocabulary_from_arrays(arrays)
+        return vectorizer
+
+    def _format(self, count_matrix: CsrMatrix) -> list[list[int]] | CsrMatrix:
+        """Return count matrix as CsrMatrix if sparse=True, as list of rows otherwise"""
+        if self.sparse:
+            return count_matrix
+        return count_matrix.toarray()
+
+    def _limit_features(self, count_matrix: CsrMatrix,
+                        doc_freq: list[int] | None = None) -> tuple[CsrMatrix, list[int]]:
+        """
+        Prune vocabulary and drop pruned columns from count matrix
+        :param count_matrix: count matrix over the whole vocabulary
+        :param doc_freq: document frequencies, computed from count_matrix if missing
+        :return: pruned count matrix and document frequencies
+        """
+        n_cols = count_matrix.shape[1]
+        if doc_freq is None:
+            word_freq = Counter(count_matrix.indices)
+            doc_freq = [word_freq[j] for j in range(n_cols)]
+        term_freq = None
+        if self.max_features is not None:
+            term_freq = [0] * n_cols
+            for j, cnt in zip(count_matrix.indices, count_matrix.data):
+                term_freq[j] += cnt
+        kept = limit_features(doc_freq, term_freq, len(count_matrix),
+                              self.min_df, self.max_df, self.max_features)
+        self._keep_columns(kept)
+        return count_matrix.select_columns(kept), [doc_freq[j] for j in kept]
+
+    def _keep_columns(self, kept: list[int]) -> None:
+        """Keep only the given columns in the vocabulary"""
+        words = list(self.feature_names)
+        self.feature_names = {words[j]: idx for idx, j in enumerate(kept)}
+
+    def _count(self, corpus: Iterable[str], grow: bool = False) -> CsrMatrix:
+        """
+        Count words of the vocabulary in each sentence
+        :param corpus: iterable of strings
+        :param grow: add unknown words to the vocabulary instead of ignoring them
         :return: count matrix for corpus
         """
-        matrix = []
-        self.set_feature_names(corpus)
+        if grow and not isinstance(self.feature_names, dict):
+            self.feature_names = dict(self.feature_names)
+        feature_names = self.feature_names
+        indptr, indices, data = array('q', [0]), array('i'), array('q')
+        tokenizer = self.tokenizer
         for sentence in corpus:
-            sentence = sentence.lower().split(' ')
-            feature_freq = [0] * len(self.feature_names)
-            cnt = Counter(sentence)
+            cnt = Counter(tokenizer(sentence))
             for k in cnt.keys():
-                feature_freq[self.feature_names[k]] = cnt[k]
-            matrix.append(feature_freq)
-        return matrix
+                idx = feature_names.get(k)
+                if idx is None:
+                    if not grow:
+                        continue
+                    idx = feature_names[k] = len(feature_names)
+                indices.append(idx)
+                data.append(cnt[k])
+            indptr.append(len(indices))
+        return CsrMatrix(indptr, indices, data, (len(indptr) - 1, len(feature_names)))
+
+
+class HashingVectorizer:
+    """
+    Convert a text corpus to a matrix of words counts without a vocabulary,
+    each word is mapped to one of n_features columns by a stable hash
+    """
+
+    def __init__(self, n_features: int = 2 ** 20, alternate_sign: bool = True, sparse: bool = True,
+                 tokenizer: Callable[[str], list[str]] | None = None):
+        """
+        :param n_features: number of columns in the output matrix
+        :param alternate_sign: give colliding words random signs so that
+        collisions cancel out on average instead of adding up
+        :param sparse: return CsrMatrix instead of a dense matrix
+        :param tokenizer: callable splitting a sentence into tokens, Tokenizer() by default
+        """
+        if n_features < 1:
+            raise ValueError("n_features must be >= 1")
+        self.n_features = n_features
+        self.alternate_sign = alternate_sign
+        self.sparse = sparse
+        self.tokenizer = tokenizer or Tokenizer()
+
+    def fit(self, corpus: Corpus = None) -> 'HashingVectorizer':
+        """
+        Nothing to learn, kept for API compatibility with CountVectorizer
+        :return: vectorizer
+        """
+        return self
+
+    partial_fit = fit
+
+    def _get_state(self) -> tuple[dict, dict]:
+        """Parameters and buffers to save"""
+        params = {'n_features': self.n_features, 'alternate_sign': self.alternate_sign, 'sparse': self.sparse}
+        return {'params': params, 'tokenizer': _tokenizer_params(self.tokenizer)}, {}
+
+    @classmethod
+    def _from_state(cls, meta: dict, arrays: dict) -> 'HashingVectorizer':
+        """Restore vectorizer saved by _get_state"""
+        return cls(tokenizer=Tokenizer(**meta['tokenizer']), **meta['params'])
+
+    def transform(self, corpus: Corpus) -> list[list[int]] | CsrMatrix:
+        """
+        Generate count matrix of hashed words
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: count matrix for corpus, CsrMatrix if sparse=True
+        """
+        return self._count(iter_corpus(corpus))
+
+    fit_transform = transform
+
+    def iter_transform(self, corpus: Corpus, chunk_size: int = 10000):
+        """
+        Lazily generate count matrix chunk by chunk
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :param chunk_size: number of sentences per chunk
+        :return: generator of count matrices, CsrMatrix if sparse=True
+        """
+        for chunk in iter_chunks(iter_corpus(corpus), chunk_size):
+            yield self._count(chunk)
+
+    def _count(self, corpus: Iterable[str]) -> list[list[int]] | CsrMatrix:
+        """Count hashed words in each sentence"""
+        n_features = self.n_features
+        indptr, indices, data = array('q', [0]), array('i'), array('q')
+        for sentence in corpus:
+            row = {}
+            for word, cnt in Counter(self.tokenizer(sentence)).items():
+                h = zlib.crc32(word.encode('UTF-8'))
+                idx = h % n_features
+                if self.alternate_sign and h & 0x80000000:
+                    cnt = -cnt
+                row[idx] = row.get(idx, 0) + cnt
+            for idx, cnt in row.items():
+                if cnt:
+                    indices.append(idx)
+                    data.append(cnt)
+            indptr.append(len(indices))
+        matrix = CsrMatrix(indptr, indices, data, (len(indptr) - 1, n_features))
+        if self.sparse:
+            return matrix
+        return matrix.toarray()
 
 
 class TfidfTransformer:
     """ Convert a count matrix to a tf-idf matrix."""
-    def tf_transform(self, count_matrix: list[list[int]]) -> list[list[float]]:
+    ENGINES = ('array', 'python')
+
+    def __init__(self, precision: int | None = 3, engine: str = 'array'):
+        """
+        :param precision: number of decimals to round to, None disables rounding
+        :param engine: 'array' works on CSR buffers column- and row-wise,
+        'python' is the reference implementation on dense lists
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Engine must be one of {self.ENGINES}")
+        self.precision = precision
+        self.engine = engine
+        self.n_docs = 0
+        self.doc_freq = []
+        self.idf_ = None
+
+    def _round(self, values):
+        """Round each value to self.precision decimals"""
+        if self.precision is None:
+            return values
+        return map(round, values, repeat(self.precision))
+
+    def tf_transform(self, count_matrix: list[list[int]] | CsrMatrix) -> list[list[float]] | CsrMatrix:
         """
         Generate term frequency matrix from count matrix
         :param count_matrix: count matrix for corpus
         :return: tf matrix
         """
-        tf_matrix = []
-        for vector in count_matrix:
-            word_cnt = sum(vector)
-            tf_row = [round(i / word_cnt, 3) for i in vector]
-            tf_matrix.append(tf_row)
-        return tf_matrix
+        if self.engine == 'python':
+            tf_matrix = self._tf_python(_dense(count_matrix))
+            return _like(count_matrix, tf_matrix)
+        matrix = _sparse(count_matrix)
+        row_sums = chain.from_iterable(map(repeat, matrix.row_l1_norms(), matrix.row_lengths()))
+        data = array('d', self._round(map(truediv, matrix.data, row_sums)))
+        return _like(count_matrix, CsrMatrix(matrix.indptr, matrix.indices, data, matrix.shape))
 
-    def idf_transform(self, count_matrix: list[list[int]]) -> list[float]:
+    def idf_transform(self, count_matrix: list[list[int]] | CsrMatrix) -> list[float]:
         """
         Generate inverse document frequency matrix from count matrix
         :param count_matrix: count matrix for corpus
         :return: idf vector
         """
-        n_docs = len(count_matrix)
-        word_freq = [0] * len(count_matrix[0])
-        for vector in count_matrix:
-            word_freq = [j + bool(k) for j, k in zip(word_freq, vector)]
-        return [round(math.log((n_docs + 1) / (word + 1)) + 1, 3) for word in word_freq]
+        return self._idf(len(count_matrix), self._doc_freq(count_matrix))
+
+    def fit(self, count_matrix: list[list[int]] | CsrMatrix) -> 'TfidfTransformer':
+        """
+        Learn idf vector from count matrix
+        :param count_matrix: count matrix for corpus
+        :return: fitted transformer
+        """
+        self.n_docs = 0
+        self.doc_freq = []
+        self.idf_ = []
+        if len(count_matrix):
+            self.partial_fit(count_matrix)
+        return self
 
-    def fit_transform(self, count_matrix: list[list[int]]) -> list[list[float]]:
+    def partial_fit(self, count_matrix: list[list[int]] | CsrMatrix) -> 'TfidfTransformer':
+        """
+        Update idf vector with a new batch of documents,
+        the batch may have more columns than the previous ones
+        :param count_matrix: count matrix for the batch
+        :return: fitted transformer
+        """
+        return self.update(len(count_matrix), self._doc_freq(count_matrix))
+
+    def update(self, n_docs: int, doc_freq: list[int]) -> 'TfidfTransformer':
+        """
+        Update idf vector with precomputed document frequencies of a batch
+        :param n_docs: number of documents in the batch
+        :param doc_freq: number of documents containing each word
+        :return: fitted transformer
+        """
+        self.doc_freq = list(map(sum, zip_longest(self.doc_freq, doc_freq, fillvalue=0)))
+        self.n_docs += n_docs
+        self.idf_ = self._idf(self.n_docs, self.doc_freq)
+        return self
+
+    def transform(self, count_matrix: list[list[int]] | CsrMatrix) -> list[list[float]] | CsrMatrix:
+        """
+        TfIdf = Tf * Idf with the learned idf vector
+        :param count_matrix: count matrix for corpus
+        :return: tf-idf matrix
+        """
+        if self.idf_ is None:
+            raise ValueError("TfidfTransformer is not fitted")
+        if len(count_matrix) and _n_cols(count_matrix) != len(self.idf_):
+            raise ValueError(f"Count matrix must have {len(self.idf_)} columns")
+        if self.engine == 'python':
+            tfidf_matrix = self._tfidf_python(_dense(count_matrix), self.idf_)
+            return _like(count_matrix, tfidf_matrix)
+        tf = self.tf_transform(_sparse(count_matrix))
+        data = array('d', self._round(map(mul, tf.data, map(self.idf_.__getitem__, tf.indices))))
+        return _like(count_matrix, CsrMatrix(tf.indptr, tf.indices, data, tf.shape))
+
+    def fit_transform(self, count_matrix: list[list[int]] | CsrMatrix) -> list[list[float]] | CsrMatrix:
         """
         TfIdf = Tf * Idf
         :param count_matrix: count matrix for corpus
         :return: tf-idf matrix
         """
-        tf = self.tf_transform(count_matrix)
-        idf = self.idf_transform(count_matrix)
-        tfidf_matrix = [[round(x * y, 3) for x, y in zip(tf_vec, idf)] for tf_vec in tf]
-        return tfidf_matrix
+        return self.fit(count_matrix).transform(count_matrix)
+
+    def _doc_freq(self, count_matrix: list[list[int]] | CsrMatrix) -> list[int]:
+        """Number of documents containing each word"""
+        if self.engine == 'python':
+            count_matrix = _dense(count_matrix)
+            word_freq = [0] * len(count_matrix[0])
+            for vector in count_matrix:
+                word_freq = [j + bool(k) for j, k in zip(word_freq, vector)]
+            return word_freq
+        matrix = _sparse(count_matrix)
+        word_freq = Counter(matrix.indices)
+        return [word_freq[j] for j in range(matrix.shape[1])]
+
+    def _idf(self, n_docs: int, doc_freq: list[int]) -> list[float]:
+        """Idf vector from number of documents and document frequencies"""
+        return list(self._round(math.log((n_docs + 1) / (word + 1)) + 1 for word in doc_freq))
+
+    def _tf_python(self, count_matrix: list[list[int]]) -> list[list[float]]:
+        """Reference tf implementation on dense lists"""
+        tf_matrix = []
+        for vector in count_matrix:
+            word_cnt = sum(map(abs, vector))
+            tf_row = list(self._round(i / word_cnt for i in vector))
+            tf_matrix.append(tf_row)
+        return tf_matrix
+
+    def _tfidf_python(self, count_matrix: list[list[int]], idf: list[float]) -> list[list[float]]:
+        """Reference tf-idf implementation on dense lists"""
+        tf = self._tf_python(count_matrix)
+        return [list(self._round(x * y for x, y in zip(tf_vec, idf))) for tf_vec in tf]
+
+
+def _sparse(matrix: list[list] | CsrMatrix) -> CsrMatrix:
+    """Return matrix as CsrMatrix"""
+    if isinstance(matrix, CsrMatrix):
+        return matrix
+    return CsrMatrix.from_dense(matrix)
+
+
+def _dense(matrix: list[list] | CsrMatrix) -> list[list]:
+    """Return matrix as list of rows"""
+    if isinstance(matrix, CsrMatrix):
+        return matrix.toarray()
+    return matrix
+
+
+def _n_cols(matrix: list[list] | CsrMatrix) -> int:
+    """Number of columns in matrix"""
+    if isinstance(matrix, CsrMatrix):
+        return matrix.shape[1]
+    return len(matrix[0]) if matrix else 0
+
+
+def _like(template: list[list] | CsrMatrix, matrix: list[list] | CsrMatrix) -> list[list] | CsrMatrix:
+    """Convert matrix to the same format (dense or CSR) as template"""
+    if isinstance(template, CsrMatrix):
+        return _sparse(matrix)
+    return _dense(matrix)
 
 
 class TfidfVectorizer(CountVectorizer):
     """ Convert a text corpus to a matrix of TF-IDF features."""
-    def __init__(self):
-        super().__init__()
+    def __init__(self, sparse: bool = False, n_jobs: int | None = 1, **kwargs):
+        """
+        :param sparse: return CsrMatrix instead of a dense matrix
+        :param n_jobs: number of processes for fit_transform, None uses all cores,
+        tokenizer must be picklable when n_jobs > 1
+        :param kwargs: tokenizer and pruning parameters of CountVectorizer
+        """
+        super().__init__(sparse, **kwargs)
+        self.n_jobs = n_jobs or os.cpu_count()
         self.tf_idf = TfidfTransformer()
 
-    def fit_transform(self, corpus: list[str]) -> list[list[float]]:
+    def fit_transform(self, corpus: Corpus) -> list[list[float]] | CsrMatrix:
         """
         Generate tf-idf matrix from corpus
-        :param corpus: list of strings
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
         :return: tf-idf matrix for corpus
         """
+        if self.n_jobs > 1:
+            count_matrix = self._parallel_count(list(iter_corpus(corpus)))
+            return self.tf_idf.transform(count_matrix)
         count_matrix = super().fit_transform(corpus)
         return self.tf_idf.fit_transform(count_matrix)
 
+    def _get_params(self) -> dict:
+        """Constructor arguments except tokenizer"""
+        return {**super()._get_params(), 'n_jobs': self.n_jobs}
+
+    def _get_state(self) -> tuple[dict, dict]:
+        """Parameters and buffers to save, including the learned idf vector"""
+        meta, arrays = super()._get_state()
+        meta['tf_idf'] = {'precision': self.tf_idf.precision, 'engine': self.tf_idf.engine,
+                          'n_docs': self.tf_idf.n_docs, 'fitted': self.tf_idf.idf_ is not None}
+        arrays['doc_freq'] = array('q', self.tf_idf.doc_freq)
+        arrays['idf'] = array('d', self.tf_idf.idf_ or [])
+        return meta, arrays
+
+    @classmethod
+    def _from_state(cls, meta: dict, arrays: dict) -> 'TfidfVectorizer':
+        """Restore vectorizer saved by _get_state"""
+        vectorizer = super()._from_state(meta, arrays)
+        tf_idf = meta['tf_idf']
+        vectorizer.tf_idf = TfidfTransformer(tf_idf['precision'], tf_idf['engine'])
+        vectorizer.tf_idf.n_docs = tf_idf['n_docs']
+        vectorizer.tf_idf.doc_freq = arrays['doc_freq']
+        vectorizer.tf_idf.idf_ = arrays['idf'] if tf_idf['fitted'] else None
+        return vectorizer
+
+    def _parallel_count(self, corpus: list[str]) -> list[list[int]] | CsrMatrix:
+        """
+        Count words in contiguous shards of corpus in a process pool, then merge
+        shard vocabularies in shard order, so columns keep the serial first-seen order,
+        and learn idf from the merged document frequencies
+        :param corpus: list of strings
+        :return: count matrix for corpus, CsrMatrix if sparse=True
+        """
+        shard_size = -(-len(corpus) // self.n_jobs) or 1
+        with ProcessPoolExecutor(self.n_jobs) as executor:
+            shards = list(executor.map(_count_shard, iter_chunks(corpus, shard_size), repeat(self.tokenizer)))
+
+        self.feature_names = feature_names = {}
+        doc_freq = []
+        indptr, indices, data = array('q', [0]), array('i'), array('q')
+        for words, matrix, shard_doc_freq in shards:
+            columns = array('i')
+            for word, freq in zip(words, shard_doc_freq):
+                idx = feature_names.get(word)
+                if idx is None:
+                    idx = feature_names[word] = len(feature_names)
+                    doc_freq.append(0)
+                doc_freq[idx] += freq
+                columns.append(idx)
+            nnz = len(indices)
+            indptr.extend(nnz + i for i in matrix.indptr[1:])
+            indices.extend(map(columns.__getitem__, matrix.indices))
+            data.extend(matrix.data)
+        count_matrix = CsrMatrix(indptr, indices, data, (len(corpus), len(feature_names)))
+        if prunes(self.min_df, self.max_df, self.max_features):
+            count_matrix, doc_freq = self._limit_features(count_matrix, doc_freq)
+        self.tf_idf.fit([])
+        self.tf_idf.update(len(corpus), doc_freq)
+        return self._format(count_matrix)
+
+    def fit(self, corpus: Corpus, chunk_size: int = 10000) -> 'TfidfVectorizer':
+        """
+        Learn vocabulary and idf vector from corpus in a single pass,
+        only one chunk of sentences is held in memory at a time
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :param chunk_size: number of sentences per chunk
+        :return: fitted vectorizer
+        """
+        self.feature_names = {}
+        self.tf_idf.fit([])
+        term_freq = []
+        for chunk in iter_chunks(iter_corpus(corpus), chunk_size):
+            count_matrix = self._count(chunk, grow=True)
+            self.tf_idf.partial_fit(count_matrix)
+            if self.max_features is not None:
+                term_freq.extend([0] * (count_matrix.shape[1] - len(term_freq)))
+                for j, cnt in zip(count_matrix.indices, count_matrix.data):
+                    term_freq[j] += cnt
+        if prunes(self.min_df, self.max_df, self.max_features):
+            n_docs, doc_freq = self.tf_idf.n_docs, self.tf_idf.doc_freq
+            kept = limit_features(doc_freq, term_freq, n_docs, self.min_df, self.max_df, self.max_features)
+            self._keep_columns(kept)
+            self.tf_idf.fit([])
+            self.tf_idf.update(n_docs, [doc_freq[j] for j in kept])
+        return self
+
+    def partial_fit(self, corpus: Corpus) -> 'TfidfVectorizer':
+        """
+        Update vocabulary and idf vector with a new batch of documents
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: fitted vectorizer
+        """
+        self.tf_idf.partial_fit(self._count(iter_corpus(corpus), grow=True))
+        return self
+
+    def transform(self, corpus: Corpus) -> list[list[float]] | CsrMatrix:
+        """
+        Generate tf-idf matrix with the learned vocabulary and idf vector
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :return: tf-idf matrix for corpus
+        """
+        return self.tf_idf.transform(super().transform(corpus))
+
+    def iter_transform(self, corpus: Corpus, chunk_size: int = 10000):
+        """
+        Lazily generate tf-idf matrix chunk by chunk
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :param chunk_size: number of sentences per chunk
+        :return: generator of tf-idf matrices, CsrMatrix if sparse=True
+        """
+        for count_matrix in super().iter_transform(corpus, chunk_size):
+            yield self.tf_idf.transform(count_matrix)
+
+
+class SimilarityIndex:
+    """Top-k cosine similarity search over rows of a tf-idf matrix."""
+
+    def __init__(self, vectorizer: TfidfVectorizer, matrix: list[list[float]] | CsrMatrix):
+        """
+        :param vectorizer: fitted vectorizer used to vectorize queries
+        :param matrix: tf-idf matrix of indexed documents produced by vectorizer
+        """
+        matrix = _sparse(matrix)
+        self.vectorizer = vectorizer
+        self.n_docs = len(matrix)
+        norms = [math.sqrt(sum(x * x for x in data)) or 1.0 for _, data in matrix]
+        weights = map(truediv, matrix.data, chain.from_iterable(map(repeat, norms, matrix.row_lengths())))
+
+        # inverted index: postings of term j are docs[ptr[j]:ptr[j + 1]]
+        doc_freq = Counter(matrix.indices)
+        self.postings_ptr = array('q', [0])
+        for j in range(matrix.shape[1]):
+            self.postings_ptr.append(self.postings_ptr[-1] + doc_freq[j])
+        self.postings_docs = array('i', bytes(4 * matrix.nnz))
+        self.postings_weights = array('d', bytes(8 * matrix.nnz))
+        fill = array('q', self.postings_ptr[:-1])
+        docs = chain.from_iterable(map(repeat, range(self.n_docs), matrix.row_lengths()))
+        for doc, j, weight in zip(docs, matrix.indices, weights):
+            pos = fill[j]
+            self.postings_docs[pos] = doc
+            self.postings_weights[pos] = weight
+            fill[j] = pos + 1
+
+    @classmethod
+    def from_corpus(cls, corpus: Corpus, **kwargs) -> 'SimilarityIndex':
+        """
+        Fit a TfidfVectorizer on corpus and index it
+        :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+        :param kwargs: TfidfVectorizer parameters
+        :return: similarity index over sentences of corpus
+        """
+        vectorizer = TfidfVectorizer(**{**kwargs, 'sparse': True})
+        return cls(vectorizer, vectorizer.fit_transform(corpus))
+
+    def most_similar(self, text: str, k: int = 10) -> list[tuple[int, float]]:
+        """
+        Find documents most similar to text
+        :param text: query string
+        :param k: number of documents to return
+        :return: list of (document number, cosine similarity), best first
+        """
+        return self.most_similar_batch([text], k)[0]
+
+    def most_similar_batch(self, texts: Iterable[str], k: int = 10) -> list[list[tuple[int, float]]]:
+        """
+        Find documents most similar to each text, only postings of query terms are scanned
+        :param texts: query strings
+        :param k: number of documents to return for each query
+        :return: list of results of most_similar for each text
+        """
+        queries = self.vectorizer.tf_idf.transform(self.vectorizer._count(texts))
+        ptr, docs, weights = self.postings_ptr, self.postings_docs, self.postings_weights
+        n_terms = len(ptr) - 1
+        results = []
+        for indices, data in queries:
+            norm = math.sqrt(sum(x * x for x in data)) or 1.0
+            scores = {}
+            for j, value in zip(indices, data):
+                if j >= n_terms:
+                    # words the vectorizer learned after indexing are in no indexed document
+                    continue
+                value /= norm
+                start, end = ptr[j], ptr[j + 1]
+                for doc, weight in zip(docs[start:end], weights[start:end]):
+                    scores[doc] = scores.get(doc, 0.0) + value * weight
+            results.append(heapq.nlargest(k, scores.items(), key=itemgetter(1)))
+        return results
+
+
+def _count_shard(corpus: list[str], tokenizer: Callable[[str], list[str]]) -> tuple[list[str], CsrMatrix, list[int]]:
+    """
+    Process pool worker for TfidfVectorizer with n_jobs > 1
+    :param corpus: shard of the corpus
+    :param tokenizer: callable splitting a sentence into tokens
+    :return: shard vocabulary, count matrix and document frequencies
+    """
+    vectorizer = CountVectorizer(sparse=True, tokenizer=tokenizer)
+    matrix = vectorizer.fit_transform(corpus)
+    word_freq = Counter(matrix.indices)
+    return vectorizer.get_feature_names(), matrix, [word_freq[j] for j in range(matrix.shape[1])]
+
+
+def iter_corpus(corpus: Corpus) -> Iterator[str]:
+    """
+    Iterate over sentences of corpus without loading it into memory
+    :param corpus: iterable of strings or os.PathLike path to a line-delimited text file
+    :return: iterator of strings
+    """
+    if isinstance(corpus, str):
+        raise TypeError("corpus must be an iterable of strings or an os.PathLike path, "
+                        "wrap a single sentence in a list or a file name in pathlib.Path")
+    if isinstance(corpus, os.PathLike):
+        return _iter_lines(corpus)
+    return iter(corpus)
+
+
+def _iter_lines(path: os.PathLike) -> Iterator[str]:
+    """Lines of a text file without line breaks"""
+    with open(path, encoding='UTF-8') as file:
+        for line in file:
+            yield line.rstrip('\n')
+
+
+def iter_chunks(iterable: Iterable, chunk_size: int) -> Iterator[list]:
+    """
+    Split iterable into lists of chunk_size items, the last one may be shorter
+    :param iterable: any iterable
+    :param chunk_size: number of items per chunk
+    :return: iterator of lists
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+MAGIC = b'CW1\x00'
+FORMAT_VERSION = 2
+_PREAMBLE = struct.Struct('<4sIQ')
+_ALIGNMENT = 8
+_SAVABLE = ('CsrMatrix', 'CountVectorizer', 'HashingVectorizer', 'TfidfVectorizer')
+
+
+def save(obj: CsrMatrix | CountVectorizer | HashingVectorizer, path: str | os.PathLike) -> None:
+    """
+    Save a matrix or a fitted vectorizer to a binary file.
+    The file holds a JSON header followed by raw 8-byte aligned buffers
+    (vocabulary, idf vector, CSR arrays) that load() can memory-map.
+    The vocabulary is stored as a UTF-8 blob with word offsets and columns
+    sorted by word, so a loaded vocabulary is searched without decoding it
+    :param obj: CsrMatrix, CountVectorizer, HashingVectorizer or TfidfVectorizer
+    :param path: path to the output file
+    """
+    name = type(obj).__name__
+    if name not in _SAVABLE:
+        raise TypeError(f"Cannot save {name}")
+    meta, arrays = obj._get_state()
+    header = {'class': name, 'byteorder': sys.byteorder, 'meta': meta, 'arrays': {}}
+    offset = 0
+    for key, buffer in arrays.items():
+        buffer = memoryview(buffer)
+        header['arrays'][key] = {'format': buffer.format, 'offset': offset, 'length': len(buffer)}
+        offset += _aligned(buffer.nbytes)
+    header = json.dumps(header, ensure_ascii=False).encode('UTF-8')
+    with open(path, 'wb') as file:
+        file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        file.write(header)
+        file.write(bytes(_aligned(file.tell()) - file.tell()))
+        for buffer in arrays.values():
+            buffer = memoryview(buffer).cast('B')
+            file.write(buffer)
+            file.write(bytes(_aligned(buffer.nbytes) - buffer.nbytes))
+
+
+def load(path: str | os.PathLike, use_mmap: bool = True) -> CsrMatrix | CountVectorizer | HashingVectorizer:
+    """
+    Load an object saved by save()
+    :param path: path to the file
+    :param use_mmap: memory-map buffers read-only instead of copying them,
+    so processes loading the same file share its pages, the vocabulary of a loaded
+    vectorizer is a MappedVocabulary over the file and is copied into a dict
+    only when partial_fit extends it
+    :return: CsrMatrix or vectorizer
+    """
+    with open(path, 'rb') as file:
+        if use_mmap:
+            content = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            content = memoryview(file.read())
+    magic, version, header_len = _PREAMBLE.unpack(content[:_PREAMBLE.size])
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a cw1 file of version {FORMAT_VERSION}")
+    header = json.loads(bytes(content[_PREAMBLE.size:_PREAMBLE.size + header_len]))
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was saved on a {header['byteorder']}-endian machine")
+    start = _aligned(_PREAMBLE.size + header_len)
+    arrays = {}
+    for key, info in header['arrays'].items():
+        offset = start + info['offset']
+        nbytes = info['length'] * struct.calcsize(info['format'])
+        buffer = content[offset:offset + nbytes].cast(info['format'])
+        arrays[key] = buffer if use_mmap else array(info['format'], buffer)
+    if header.get('class') not in _SAVABLE:
+        raise ValueError(f"{path} holds an unsupported class {header.get('class')!r}")
+    cls = globals()[header['class']]
+    return cls._from_state(header['meta'], arrays)
+
+
+def _aligned(size: int) -> int:
+    """Round size up to a multiple of _ALIGNMENT"""
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _tokenizer_params(tokenizer: Callable[[str], list[str]]) -> dict:
+    """Parameters of a tokenizer that can be saved"""
+    if not isinstance(tokenizer, Tokenizer):
+        raise TypeError("Only vectorizers with a Tokenizer can be saved")
+    return tokenizer.get_params()
+
+
+def _vocabulary_to_arrays(feature_names: Mapping[str, int]) -> dict[str, array]:
+    """Pack vocabulary into a UTF-8 blob, byte offsets of each word and columns sorted by word"""
+    words = [word.encode('UTF-8') for word in feature_names]
+    offsets = array('q', [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+    order = array('i', sorted(range(len(words)), key=words.__getitem__))
+    return {'vocabulary': array('B', b''.join(words)), 'vocabulary_offsets': offsets, 'vocabulary_order': order}
+
+
+def _vocabulary_from_arrays(arrays: dict) -> 'MappedVocabulary':
+    """Vocabulary over buffers packed by _vocabulary_to_arrays"""
+    return MappedVocabulary(arrays['vocabulary'], arrays['vocabulary_offsets'], arrays['vocabulary_order'])
+
+
+class MappedVocabulary(Mapping):
+    """
+    Read-only vocabulary {word: column} over buffers of a saved vectorizer.
+    Words are found by bisection over columns sorted by word, so loading takes
+    no time and memory-mapped buffers are shared by processes. A lookup costs
+    O(log n) instead of a dict lookup, dict(vocabulary) trades memory for speed
+    """
+    __slots__ = ('blob', 'offsets', 'order')
+
+    def __init__(self, blob: memoryview | array, offsets: memoryview | array, order: memoryview | array):
+        """
+        :param blob: UTF-8 words in column order
+        :param offsets: byte offset of each word in blob and the blob length
+        :param order: columns sorted by the bytes of their words
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self._word(idx).decode('UTF-8')
+
+    def __getitem__(self, word: str) -> int:
+        if not isinstance(word, str):
+            raise KeyError(word)
+        key = word.encode('UTF-8')
+        pos = bisect.bisect_left(self.order, key, key=self._word)
+        if pos == len(self.order) or self._word(self.order[pos]) != key:
+            raise KeyError(word)
+        return self.order[pos]
+
+    def _word(self, idx: int) -> bytes:
+        """UTF-8 bytes of the word in column idx"""
+        return bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]])
+
 
 if __name__ == '__main__':
+    import pathlib
+    import tempfile
+
     corpus = [
         'Crock Pot Pasta Never boil pasta again',
         'Pasta Pomodoro Fresh ingredients Parmesan to taste'
@@ -142,3 +1084,159 @@ if __name__ == '__main__':
     assert tfidf_matrix2 == [
         [0.201, 0.201, 0.286, 0.201, 0.201, 0.201, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
         [0.0, 0.0, 0.143, 0.0, 0.0, 0.0, 0.201, 0.201, 0.201, 0.201, 0.201, 0.201]]
+
+    vectorizer3 = CountVectorizer(sparse=True)
+    count_matrix3 = vectorizer3.fit_transform(corpus)
+    assert count_matrix3.shape == (2, 12)
+    assert count_matrix3.nnz == 13
+    assert count_matrix3.toarray() == count_matrix1
+    assert transformer.tf_transform(count_matrix3).toarray() == tf_matrix
+    assert transformer.idf_transform(count_matrix3) == idf_matrix
+    assert transformer.fit_transform(count_matrix3).toarray() == tfidf_matrix1
+
+    vectorizer4 = TfidfVectorizer(sparse=True)
+    assert vectorizer4.fit_transform(corpus).toarray() == tfidf_matrix2
+
+    reference = TfidfTransformer(engine='python')
+    assert reference.tf_transform(count_matrix1) == tf_matrix
+    assert reference.idf_transform(count_matrix1) == idf_matrix
+    assert reference.fit_transform(count_matrix1) == tfidf_matrix1
+    assert reference.fit_transform(count_matrix3).toarray() == tfidf_matrix1
+    exact = TfidfTransformer(precision=None).fit_transform(count_matrix3).toarray()
+    assert exact == TfidfTransformer(precision=None, engine='python').fit_transform(count_matrix1)
+
+    vectorizer5 = CountVectorizer().fit(corpus)
+    assert vectorizer5.transform(['pasta to go', 'fresh PASTA pasta']) == [
+        [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0],
+        [0, 0, 2, 0, 0, 0, 0, 1, 0, 0, 0, 0]]
+    vectorizer5.partial_fit(['pasta to go'])
+    assert vectorizer5.get_feature_names()[-1] == 'go'
+    assert vectorizer5.feature_names['go'] == 12
+    assert vectorizer5.fit_transform(corpus1) == count_matrix1
+
+    vectorizer6 = TfidfVectorizer().fit(corpus)
+    assert vectorizer6.tf_idf.idf_ == idf_matrix
+    assert vectorizer6.transform(corpus) == tfidf_matrix2
+    vectorizer7 = TfidfVectorizer(sparse=True)
+    vectorizer7.partial_fit(corpus[:1]).partial_fit(corpus[1:])
+    assert vectorizer7.transform(corpus).toarray() == tfidf_matrix2
+    assert TfidfTransformer(engine='python').fit(count_matrix1).transform(count_matrix1) == tfidf_matrix1
+
+    lines = ['Pasta Pomodoro', 'Crock Pot Pasta', 'pot pasta', 'Fresh pasta']
+    path = pathlib.Path(tempfile.mkdtemp(), 'corpus.txt')
+    with open(path, 'w', encoding='UTF-8') as corpus_file:
+        corpus_file.write('\n'.join(lines) + '\n')
+    vectorizer8 = CountVectorizer(sparse=True)
+    count_matrix8 = vectorizer8.fit_transform(path)
+    assert vectorizer8.get_feature_names() == ['pasta', 'pomodoro', 'crock', 'pot', 'fresh']
+    chunks = list(vectorizer8.iter_transform(iter(lines), chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert [row for chunk in chunks for row in chunk.toarray()] == count_matrix8.toarray()
+    assert CountVectorizer().fit_transform(line for line in lines) == count_matrix8.toarray()
+    vectorizer9 = TfidfVectorizer().fit(path, chunk_size=3)
+    assert vectorizer9.transform(lines) == TfidfVectorizer().fit_transform(lines)
+    assert [row for chunk in vectorizer9.iter_transform(path, 2) for row in chunk] == vectorizer9.transform(lines)
+
+    hashing = HashingVectorizer(n_features=2 ** 10, alternate_sign=False)
+    hashed_matrix = hashing.transform(corpus)
+    assert hashed_matrix.shape == (2, 2 ** 10)
+    assert hashed_matrix.row_l1_norms() == [7, 7]
+    assert hashed_matrix.toarray() == HashingVectorizer(2 ** 10, False, sparse=False).transform(corpus)
+    assert sorted(hashed_matrix.toarray()[0], reverse=True)[:2] == [2, 1]
+    signed_matrix = HashingVectorizer(n_features=2 ** 10).transform(corpus)
+    assert list(map(abs, signed_matrix.data)) == list(hashed_matrix.data)
+    hashed_tfidf = TfidfTransformer().fit_transform(signed_matrix)
+    assert sorted(map(abs, hashed_tfidf.data)) == sorted(x for row in tfidf_matrix1 for x in row if x)
+
+    big_corpus = lines * 5 + corpus
+    vectorizer10 = TfidfVectorizer(sparse=True, n_jobs=3)
+    assert vectorizer10.fit_transform(big_corpus).toarray() == TfidfVectorizer().fit_transform(big_corpus)
+    assert vectorizer10.get_feature_names() == TfidfVectorizer().fit(big_corpus).get_feature_names()
+    assert TfidfVectorizer(n_jobs=2).fit_transform(corpus) == tfidf_matrix2
+
+    tokenizer = Tokenizer(stop_words={'to', 'again'}, ngram_range=(1, 2))
+    assert tokenizer('Never  boil pasta, again!') == ['never', 'boil', 'pasta', 'never boil', 'boil pasta']
+    assert Tokenizer(analyzer='char', ngram_range=(2, 3))('Pot') == ['po', 'ot', 'pot']
+    assert CountVectorizer().fit_transform(['Pasta,  pasta!']) == [[2]]
+    vectorizer11 = CountVectorizer(min_df=2)
+    assert vectorizer11.fit_transform(big_corpus[:4]) == [[1, 0], [1, 1], [1, 1], [1, 0]]
+    assert vectorizer11.get_feature_names() == ['pasta', 'pot']
+    vectorizer12 = CountVectorizer(max_df=0.5, max_features=2).fit(corpus)
+    assert vectorizer12.get_feature_names() == ['crock', 'pot']
+    vectorizer13 = TfidfVectorizer(sparse=True, tokenizer=tokenizer, min_df=2, max_features=3)
+    pruned_tfidf = vectorizer13.fit_transform(big_corpus).toarray()
+    assert vectorizer13.get_feature_names() == ['pasta', 'pot', 'pot pasta']
+    assert TfidfVectorizer(tokenizer=tokenizer, min_df=2, max_features=3).fit(big_corpus, 3).transform(
+        big_corpus) == pruned_tfidf
+    assert TfidfVectorizer(sparse=True, n_jobs=2, tokenizer=tokenizer, min_df=2, max_features=3).fit_transform(
+        big_corpus).toarray() == pruned_tfidf
+
+    model_path = os.path.join(tempfile.mkdtemp(), 'model.cw1')
+    for use_mmap in (True, False):
+        save(vectorizer13, model_path)
+        restored = load(model_path, use_mmap)
+        assert restored.get_feature_names() == vectorizer13.get_feature_names()
+        assert restored.transform(big_corpus).toarray() == pruned_tfidf
+        save(restored.transform(corpus), model_path)
+        assert load(model_path, use_mmap).toarray() == vectorizer13.transform(corpus).toarray()
+    save(CountVectorizer().fit(['Привет мир']), model_path)
+    assert load(model_path).transform(['мир']) == [[0, 1]]
+    save(hashing, model_path)
+    assert load(model_path).transform(corpus).toarray() == hashed_matrix.toarray()
+
+    index = SimilarityIndex.from_corpus(lines)
+    assert [doc for doc, _ in index.most_similar('pot of pasta', k=2)] == [2, 1]
+    best_doc, best_score = index.most_similar('Fresh pasta')[0]
+    assert best_doc == 3 and math.isclose(best_score, 1.0)
+    assert index.most_similar('python') == []
+    assert index.most_similar_batch(['pomodoro', 'crock'], k=1) == [
+        index.most_similar('pomodoro', k=1), index.most_similar('crock', k=1)]
+    dense_index = SimilarityIndex(vectorizer2, tfidf_matrix2)
+    assert [doc for doc, _ in dense_index.most_similar('pasta')] == [0, 1]
+    vectorizer_max1 = CountVectorizer(max_df=1)
+    assert vectorizer_max1.fit_transform(['a b', 'a c', 'a d']) == [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    assert vectorizer_max1.get_feature_names() == ['b', 'c', 'd']
+    assert CountVectorizer(min_df=1.0).fit(['a b', 'a c', 'a d']).get_feature_names() == ['a']
+    assert TfidfVectorizer().fit(corpus).transform([]) == []
+    assert TfidfVectorizer(sparse=True).fit(corpus).transform([]).shape == (0, 12)
+    assert TfidfTransformer(engine='python').fit([[1, 0], [1, 1]]).transform([]) == []
+    with tempfile.TemporaryDirectory() as directory:
+        forged_path = os.path.join(directory, 'forged.cw1')
+        forged = json.dumps({'class': 'Tokenizer', 'byteorder': sys.byteorder, 'meta': {}, 'arrays': {}}).encode()
+        with open(forged_path, 'wb') as forged_file:
+            forged_file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(forged)) + forged)
+        try:
+            load(forged_path, use_mmap=False)
+        except ValueError:
+            pass
+        else:
+            assert False, 'load must reject classes that save does not write'
+    grown_index = SimilarityIndex.from_corpus(corpus)
+    grown_index.vectorizer.partial_fit(['zzz pasta'])
+    assert [doc for doc, _ in grown_index.most_similar('zzz pasta')] == [0, 1]
+    assert grown_index.most_similar('zzz') == []
+    signed_counts = HashingVectorizer(n_features=4, sparse=False).transform(['a b c d e f', 'pasta pot pasta'])
+    assert TfidfTransformer(engine='python').fit_transform(signed_counts) == \
+        TfidfTransformer().fit_transform(signed_counts)
+    assert not prunes() and prunes(max_df=1) and prunes(min_df=1.0) and prunes(max_features=10)
+    try:
+        vectorizer1.transform('pasta to go')
+    except TypeError:
+        pass
+    else:
+        assert False, 'a bare string must not be read as a file name'
+    with tempfile.TemporaryDirectory() as directory:
+        vocabulary_path = os.path.join(directory, 'vocabulary.cw1')
+        mapped_source = TfidfVectorizer(sparse=True).fit(big_corpus + ['Ёлка ёж', 'Ёж'])
+        save(mapped_source, vocabulary_path)
+        for use_mmap in (True, False):
+            mapped = load(vocabulary_path, use_mmap)
+            assert isinstance(mapped.feature_names, MappedVocabulary)
+            assert dict(mapped.feature_names) == mapped_source.feature_names
+            assert 'ёж' in mapped.feature_names and 'zzz' not in mapped.feature_names
+            assert 1 not in mapped.feature_names
+            assert mapped.transform(big_corpus).toarray() == mapped_source.transform(big_corpus).toarray()
+            mapped.partial_fit(['zzz pasta'])
+            assert isinstance(mapped.feature_names, dict)
+            assert mapped.feature_names['zzz'] == len(mapped_source.feature_names)
+            del mapped
@@ -1,4 +1,5 @@
 import functools
+import re
 from typing import Callable
 
 
@@ -10,6 +11,7 @@ class EmojiMixin:
         'water': '🌊',
         'electric': '⚡'
     }
+    STR_CACHE_SIZE = 0
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -17,16 +19,61 @@ class EmojiMixin:
 
     @classmethod
     def _replace_str(cls, func: Callable) -> Callable:
+        replace = cls._compile_icons()
+        if cls.STR_CACHE_SIZE:
+            replace = functools.lru_cache(maxsize=cls.STR_CACHE_SIZE)(replace)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            text: str = func(*args, **kwargs)
-            for word, emoji in cls.ICON.items():
-                replaced = text.replace(word, emoji)
-                if replaced != text:
-                    return replaced
-            return text
+            return replace(func(*args, **kwargs))
         return wrapper
 
+    @classmethod
+    def _compile_icons(cls) -> Callable[[str], str]:
+        """
+        Собирает ICON в одно регулярное выражение-префиксное дерево. Заменяются
+        все вхождения первого по порядку ICON слова, которое есть в тексте
+        :return: функция замены текста
+        """
+        icons = [(word, emoji) for word, emoji in cls.ICON.items() if word and word != emoji]
+        if not icons:
+            return str
+        # в каждой позиции выражение находит самое длинное слово, вместе с ним
+        # в этой позиции есть и все слова ICON, которые являются его префиксами
+        rank = {word: min(i for i, (prefix, _) in enumerate(icons) if word.startswith(prefix))
+                for word, _ in icons}
+        finditer = re.compile(f'(?=({_trie_pattern(rank)}))').finditer
+
+        def replace(text: str) -> str:
+            best = len(icons)
+            for match in finditer(text):
+                best = min(best, rank[match.group(1)])
+                if not best:
+                    break
+            if best == len(icons):
+                return text
+            word, emoji = icons[best]
+            return text.replace(word, emoji)
+        return replace
+
+
+def _trie_pattern(words) -> str:
+    """Регулярное выражение для набора слов в виде префиксного дерева, предпочитает самое длинное слово"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+    return build(trie)
+
 
 class Pokemon(EmojiMixin):
     """Класс Покемон, который выводит имя и категорию покемона"""
@@ -43,3 +90,27 @@ if __name__ == '__main__':
     print(bulbasaur)
     pikachu = Pokemon(name='Pikachu', poketype='electric')
     print(pikachu)
+
+    assert str(bulbasaur) == 'Bulbasaur/🌿' and str(pikachu) == 'Pikachu/⚡'
+    assert str(Pokemon(name='watery fire', poketype='grass')) == 'watery fire/🌿'
+    assert str(Pokemon(name='firewater', poketype='water')) == '🔥water/water'
+    assert str(Pokemon(name='Ditto', poketype='normal')) == 'Ditto/normal'
+
+    class CachedPokemon(Pokemon):
+        ICON = {'fire': '🔥', 'fir': '🌲'}
+        STR_CACHE_SIZE = 16
+
+    assert str(CachedPokemon(name='Charmander', poketype='fire')) == 'Charmander/🔥'
+    assert str(CachedPokemon(name='Spruce', poketype='fir')) == 'Spruce/🌲'
+    assert CachedPokemon.__str__.__wrapped__ is Pokemon.__str__
+
+    class ShortFirst(EmojiMixin):
+        ICON = {'ab': '1', 'abcd': '2', 'bc': '3'}
+
+        def __init__(self, text: str):
+            self.text = text
+
+        def __str__(self):
+            return self.text
+
+    assert [str(ShortFirst(text)) for text in ('xabcdab', 'abcd', 'bc-abc', 'zz')] == ['x1cd1', '1cd', 'bc-1c', 'zz']
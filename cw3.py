@@ -1,16 +1,48 @@
+import functools
+import sys
+import weakref
+from itertools import groupby
+from operator import add
+
+
 class Color:
     """Класс Color, который выводит ● в заданном цвете RGB"""
     END = "\033[0"
     START = "\033[1;38;2"
     MOD = "m"
+    __slots__ = ("red_level_", "green_level_", "blue_level_", "_hash", "_repr", "_frozen", "__weakref__")
+    _interned = weakref.WeakValueDictionary()
 
     def __init__(self, r, g, b):
+        self._frozen = False
         self.red_level = r
         self.green_level = g
         self.blue_level = b
 
+    @classmethod
+    def interned(cls, r, g, b):
+        """Общий неизменяемый экземпляр цвета, живёт пока на него есть ссылки"""
+        key = (cls, r, g, b)
+        color = cls._interned.get(key)
+        if color is None:
+            color = cls(r, g, b)
+            color._frozen = True
+            cls._interned[key] = color
+        return color
+
     def __repr__(self):
-        return f"{self.START};{self.red_level};{self.green_level};{self.blue_level}{self.MOD}●{self.END}{self.MOD}"
+        if self._repr is None:
+            self._repr = (
+                f"{self.START};{self.red_level};{self.green_level};{self.blue_level}{self.MOD}●{self.END}{self.MOD}"
+            )
+        return self._repr
+
+    def _changed(self):
+        """Сброс запомненных hash и repr перед изменением канала"""
+        if self._frozen:
+            raise AttributeError("Interned color is immutable")
+        self._hash = None
+        self._repr = None
 
     @staticmethod
     def _is_correct_ch(channel):
@@ -35,16 +67,19 @@ class Color:
     @red_level.setter
     def red_level(self, channel):
         Color._is_correct_ch(channel)
+        self._changed()
         self.red_level_ = channel
 
     @blue_level.setter
     def blue_level(self, channel):
         Color._is_correct_ch(channel)
+        self._changed()
         self.blue_level_ = channel
 
     @green_level.setter
     def green_level(self, channel):
         Color._is_correct_ch(channel)
+        self._changed()
         self.green_level_ = channel
 
     def __eq__(self, other):
@@ -56,12 +91,16 @@ class Color:
 
     def __add__(self, other):
         """Смешение цветов"""
+        if not isinstance(other, Color):
+            return NotImplemented
         return Color(self.red_level + other.red_level, self.green_level + other.green_level,
                      self.blue_level + other.blue_level)
 
     def __hash__(self):
         """Вывод уникальных цветов из списка"""
-        return hash((self.red_level, self.green_level, self.blue_level))
+        if self._hash is None:
+            self._hash = hash((self.red_level_, self.green_level_, self.blue_level_))
+        return self._hash
 
     def __mul__(self, other):
         """Уменьшение контраста цвета"""
@@ -78,6 +117,152 @@ class Color:
         return self.__mul__(other)
 
 
+class ColorArray:
+    """Массив цветов, упакованных в bytearray по три байта RGB на цвет"""
+    __hash__ = None
+
+    def __init__(self, data=b""):
+        if len(data) % 3:
+            raise ValueError("Buffer length must be a multiple of 3")
+        self.data = bytearray(data)
+
+    @classmethod
+    def from_colors(cls, colors):
+        """Упаковка списка Color в массив"""
+        return cls(bytes(channel for color in colors
+                         for channel in (color.red_level, color.green_level, color.blue_level)))
+
+    def __len__(self):
+        return len(self.data) // 3
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ColorArray index out of range")
+        r, g, b = self.data[3 * index:3 * index + 3]
+        return Color(r, g, b)
+
+    def __iter__(self):
+        channels = iter(self.data)
+        return (Color(r, g, b) for r, g, b in zip(channels, channels, channels))
+
+    def __contains__(self, color):
+        return self.index(color) >= 0
+
+    def __repr__(self):
+        return "".join(map(repr, self))
+
+    def index(self, color):
+        """Номер первого вхождения цвета или -1"""
+        pixel = bytes((color.red_level, color.green_level, color.blue_level))
+        position = self.data.find(pixel)
+        while position >= 0 and position % 3:
+            position = self.data.find(pixel, position + 1)
+        return position // 3 if position >= 0 else -1
+
+    def append(self, color):
+        self.data += bytes((color.red_level, color.green_level, color.blue_level))
+
+    def __eq__(self, other):
+        """Сравнение массивов цветов"""
+        if not isinstance(other, ColorArray):
+            return NotImplemented
+        return self.data == other.data
+
+    def __add__(self, other):
+        """Смешение с насыщением: с цветом или поэлементно с массивом той же длины"""
+        if isinstance(other, Color):
+            mixed = bytearray(len(self.data))
+            for channel, level in enumerate((other.red_level, other.green_level, other.blue_level)):
+                mixed[channel::3] = self.data[channel::3].translate(_saturated_add_table(level))
+            return ColorArray(mixed)
+        if not isinstance(other, ColorArray):
+            return NotImplemented
+        if len(other.data) != len(self.data):
+            raise ValueError("Color arrays must have the same length")
+        return ColorArray(bytes(map(_SATURATED.__getitem__, map(add, self.data, other.data))))
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        """Уменьшение контраста всех цветов"""
+        return ColorArray(self.data.translate(_contrast_table(other)))
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def unique(self):
+        """Уникальные цвета в порядке первого появления"""
+        data = bytes(self.data)
+        pixels = dict.fromkeys(data[i:i + 3] for i in range(0, len(data), 3))
+        return ColorArray(b"".join(pixels))
+
+
+_SATURATED = bytes(min(level, 255) for level in range(511))
+
+
+@functools.lru_cache(maxsize=256)
+def _saturated_add_table(level):
+    """Таблица translate, прибавляющая level к каналу с насыщением"""
+    return _SATURATED[level:level + 256]
+
+
+@functools.lru_cache(maxsize=256)
+def _contrast_table(other):
+    """Таблица translate для Color.__mul__ с тем же коэффициентом контраста"""
+    if other < 0 or other > 1:
+        raise ValueError("Contrast constant must be between 0 and 1")
+    cl = -256 * (1 - other)
+    f = 259 * (cl + 255) / (255 * (259 - cl))
+    return bytes(int(f * (level - 128) + 128) for level in range(256))
+
+
+class ColorRenderer:
+    """Отрисовка строк цветов целыми кадрами, одна запись в поток на кадр"""
+    HOME = "\033[H"
+    CACHE_SIZE = 1 << 16
+
+    def __init__(self, file=None, swatch="●"):
+        self.file = file
+        self.swatch = swatch
+        self._prefixes = {}
+
+    def _prefix(self, key):
+        """Escape-последовательность цвета, запоминается для каждого цвета"""
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            if len(self._prefixes) >= self.CACHE_SIZE:
+                self._prefixes.clear()
+            prefix = self._prefixes[key] = f"{Color.START};{key[0]};{key[1]};{key[2]}{Color.MOD}"
+        return prefix
+
+    def render_row(self, row):
+        """Строка из Color или ColorArray, подряд идущие одинаковые цвета выводятся одной серией"""
+        if isinstance(row, ColorArray):
+            data = bytes(row.data)
+            keys = (data[i:i + 3] for i in range(0, len(data), 3))
+        else:
+            keys = ((color.red_level, color.green_level, color.blue_level) for color in row)
+        reset = Color.END + Color.MOD
+        return "".join(self._prefix(key) + self.swatch * sum(1 for _ in run) + reset
+                       for key, run in groupby(keys))
+
+    def render(self, rows):
+        """Кадр из строк цветов"""
+        return "".join(self.render_row(row) + "\n" for row in rows)
+
+    def draw(self, rows, home=False):
+        """
+        Вывод кадра одной записью
+        :param rows: строки из Color или ColorArray
+        :param home: перевести курсор в начало экрана, чтобы перерисовать предыдущий кадр
+        """
+        file = self.file or sys.stdout
+        file.write(self.HOME + self.render(rows) if home else self.render(rows))
+        file.flush()
+
+
 if __name__ == '__main__':
     red = Color(255, 0, 0)
     green = Color(0, 255, 0)
@@ -90,3 +275,34 @@ if __name__ == '__main__':
     print(set(color_list))
     print(0.5 * red)
     print(red * 0.8)
+
+    pixels = ColorArray.from_colors(color_list)
+    print(pixels)
+    assert len(pixels) == 4 and pixels[1] == red and pixels[-1] == orange2
+    assert list(pixels * 0.5) == [color * 0.5 for color in color_list]
+    assert list(pixels + green) == [Color(255, 255, 0), Color(255, 255, 0), Color(0, 255, 0), Color(255, 255, 0)]
+    assert green + pixels == pixels + green
+    assert list(pixels + pixels)[1] == red
+    assert list(pixels.unique()) == [orange1, red, green]
+    assert green in pixels and Color(0, 0, 255) not in pixels
+    assert ColorArray(bytes([0, 255, 0, 255, 0, 0])).index(red) == 1
+
+    assert Color.interned(255, 0, 0) is Color.interned(255, 0, 0) == red
+    assert len({Color.interned(255, 165, 0), orange1, orange2}) == 1
+    try:
+        Color.interned(1, 2, 3).red_level = 4
+    except AttributeError:
+        pass
+    else:
+        assert False, "interned colors must be immutable"
+    recolored = Color(1, 2, 3)
+    assert hash(recolored) == hash((1, 2, 3)) and repr(recolored).startswith("\033[1;38;2;1;2;3m")
+    recolored.red_level = 4
+    assert hash(recolored) == hash((4, 2, 3)) and repr(recolored).startswith("\033[1;38;2;4;2;3m")
+    assert not hasattr(recolored, "__dict__")
+
+    renderer = ColorRenderer()
+    assert renderer.render_row(color_list) == "".join(map(repr, color_list))
+    assert renderer.render([[red, red, green]]) == repr(red).replace("●", "●●") + repr(green) + "\n"
+    assert renderer.render([ColorArray.from_colors(color_list)]) == renderer.render([color_list])
+    renderer.draw([color_list, pixels * 0.5])
@@ -1,12 +1,432 @@
+import argparse
 import csv
+import json
+import math
+import os
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
+CHUNK_SIZE = 16 * 1024 * 1024
+CORP_SUMMARY_PATH = 'C:/AAA/Corp_Summary.csv'
+REPORT_PATH = 'C:/AAA/corp_report.csv'
+FIELDNAMES = ['Департамент', 'Кол-во сотрудников', 'Вилка зарплаты', 'Средняя зарплата', 'Медианная зарплата']
 
-def menu() -> None:
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch: counts of exact values while there are
+    at most max_size distinct ones, then counts of log-spaced buckets, which
+    keeps the relative error of quantiles below alpha in constant memory
+    """
+    __slots__ = ('alpha', 'max_size', 'counts', 'count', 'exact')
+    ZERO_KEY = -2 ** 63
+
+    def __init__(self, alpha: float = 0.005, max_size: int = 2048):
+        self.alpha = alpha
+        self.max_size = max_size
+        self.counts = {}
+        self.count = 0
+        self.exact = True
+
+    def add(self, value: int | float, n: int = 1) -> None:
+        """
+        The method adds a value to the sketch
+        :param value: value to add.
+        :param n: number of times to add the value.
+        """
+        key = value if self.exact else self._key(value)
+        self.counts[key] = self.counts.get(key, 0) + n
+        self.count += n
+        if self.exact and len(self.counts) > self.max_size:
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        The method adds values of another sketch
+        :param other: sketch to add.
+        """
+        if self.exact and not other.exact:
+            self._compress()
+        for key, n in other.counts.items():
+            if other.exact and not self.exact:
+                key = self._key(key)
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.count += other.count
+        if self.exact and len(self.counts) > self.max_size:
+            self._compress()
+
+    def quantile(self, q: float) -> float:
+        """
+        The method estimates a quantile with linear interpolation between closest ranks
+        :param q: quantile between 0 and 1.
+        :return: estimated value.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            raise ValueError("Sketch is empty")
+        position = q * (self.count - 1)
+        low_rank, high_rank = math.floor(position), math.ceil(position)
+        low = high = None
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if low is None and seen > low_rank:
+                low = self._value(key)
+            if seen > high_rank:
+                high = self._value(key)
+                break
+        return low + (high - low) * (position - low_rank)
+
+    def _gamma(self) -> float:
+        return (1 + self.alpha) / (1 - self.alpha)
+
+    def _key(self, value: int | float) -> int:
+        """Bucket of a value"""
+        if value <= 0:
+            return self.ZERO_KEY
+        return math.ceil(math.log(value, self._gamma()))
+
+    def _value(self, key: int | float) -> float:
+        """Representative value of a key"""
+        if self.exact:
+            return key
+        if key == self.ZERO_KEY:
+            return 0
+        gamma = self._gamma()
+        return 2 * gamma ** key / (gamma + 1)
+
+    def _compress(self) -> None:
+        """Switch from exact values to buckets"""
+        counts = {}
+        for value, n in self.counts.items():
+            key = self._key(value)
+            counts[key] = counts.get(key, 0) + n
+        self.counts = counts
+        self.exact = False
+
+
+class DepartmentStats:
+    """Running statistics of one department"""
+    __slots__ = ('count', 'min', 'max', 'sum', 'teams', 'salaries')
+
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+        self.teams = {}
+        self.salaries = QuantileSketch()
+
+    def add(self, team: str, salary: int) -> None:
+        """
+        The method adds an employee to the statistics
+        :param team: team of the employee.
+        :param salary: salary of the employee.
+        """
+        if self.count == 0:
+            self.min = self.max = salary
+        elif salary < self.min:
+            self.min = salary
+        elif salary > self.max:
+            self.max = salary
+        self.count += 1
+        self.sum += salary
+        self.teams[team] = None
+        self.salaries.add(salary)
+
+    def merge(self, other: 'DepartmentStats') -> None:
+        """
+        The method adds statistics of the same department from another part of the data
+        :param other: statistics to add.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0 or other.min < self.min:
+            self.min = other.min
+        if self.count == 0 or other.max > self.max:
+            self.max = other.max
+        self.count += other.count
+        self.sum += other.sum
+        self.teams.update(other.teams)
+        self.salaries.merge(other.salaries)
+
+    def summary(self, percentiles: Iterable[float] = ()) -> list:
+        """
+        The method returns summary statistics of the department
+        :param percentiles: additional salary percentiles to compute, from 0 to 100.
+        :return: [number of workers, fork salary, mean salary, median salary, *percentiles].
+        """
+        quantiles = [self.salaries.quantile(p / 100) for p in (50, *percentiles)]
+        return [self.count, f'{self.min}–{self.max}', f'{self.sum / self.count:.2f}',
+                *(f'{quantile:.2f}' for quantile in quantiles)]
+
+
+class CorpReport:
+    """Summary of departments aggregated in a single pass over employee records"""
+
+    def __init__(self):
+        self.departments = {}
+        self._summaries = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> 'CorpReport':
+        """
+        The method aggregates records about employees
+        :param rows: iterable of dictionaries with records about employees.
+        :return: report.
+        """
+        return cls().update(rows)
+
+    @classmethod
+    def from_csv(cls, path: str, n_jobs: int | None = 1, chunk_size: int = CHUNK_SIZE) -> 'CorpReport':
+        """
+        The method aggregates records about employees streamed from a csv file.
+        With n_jobs > 1 the file is split on line boundaries into chunks of about
+        chunk_size bytes, which are parsed and aggregated in a process pool
+        (quoted fields must not contain line breaks)
+        :param path: path to csv file.
+        :param n_jobs: number of processes, None uses all cores.
+        :param chunk_size: size of a chunk in bytes.
+        :return: report.
+        """
+        n_jobs = n_jobs or os.cpu_count()
+        if n_jobs == 1:
+            return cls().update(iter_csv_rows(path))
+        report = cls()
+        chunks = split_csv(path, chunk_size)
+        if not chunks:
+            return report
+        starts = [start for start, _, _ in chunks]
+        ends = [end for _, end, _ in chunks]
+        columns = [chunk_columns for _, _, chunk_columns in chunks]
+        with ProcessPoolExecutor(n_jobs) as executor:
+            for partial in executor.map(_aggregate_chunk, repeat(path, len(chunks)), starts, ends, columns):
+                report.merge(partial)
+        return report
+
+    def merge(self, other: 'CorpReport') -> 'CorpReport':
+        """
+        The method adds a report on another part of the data,
+        departments and teams keep the order in which they were first seen
+        :param other: report to add.
+        :return: report.
+        """
+        for department, stats in other.departments.items():
+            self.departments.setdefault(department, DepartmentStats()).merge(stats)
+        self._summaries = {}
+        return self
+
+    def update(self, rows: Iterable[dict]) -> 'CorpReport':
+        """
+        The method adds records about employees to the report
+        :param rows: iterable of dictionaries with records about employees.
+        :return: report.
+        """
+        departments = self.departments
+        for row in rows:
+            stats = departments.get(row['Департамент'])
+            if stats is None:
+                stats = departments[row['Департамент']] = DepartmentStats()
+            stats.add(row['Отдел'], int(row['Оклад']))
+        self._summaries = {}
+        return self
+
+    def hierarchy(self) -> dict[str, list]:
+        """
+        The method returns a list of teams for each department
+        :return: dictionary {department: teams}.
+        """
+        return {department: list(stats.teams) for department, stats in self.departments.items()}
+
+    def summary(self, percentiles: Iterable[float] = ()) -> dict[str, list]:
+        """
+        The method returns summary statistics for each department,
+        the result is cached until the report is updated
+        :param percentiles: additional salary percentiles to compute, from 0 to 100.
+        :return: dictionary {department: summary statistics}.
+        """
+        percentiles = tuple(percentiles)
+        if percentiles not in self._summaries:
+            self._summaries[percentiles] = {department: stats.summary(percentiles)
+                                            for department, stats in self.departments.items()}
+        return self._summaries[percentiles]
+
+
+class IncrementalCorpReport(CorpReport):
+    """
+    Report on a csv file that keeps growing: refresh() remembers the file offset
+    and folds only rows appended since the previous call into the statistics.
+    The file, the first and the last FINGERPRINT_SIZE bytes of the part already
+    read are remembered to notice that the file was rewritten
+    """
+    FINGERPRINT_SIZE = 4096
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.offset = 0
+        self.columns = None
+        self._inode = None
+        self._head = b''
+        self._tail = b''
+
+    def refresh(self) -> int:
+        """
+        The method adds complete rows appended to the file since the previous call,
+        the report is rebuilt from scratch if the file was truncated or rewritten
+        :return: number of added rows.
+        """
+        with open(self.path, 'rb') as csv_file:
+            stat = os.fstat(csv_file.fileno())
+            if self.offset and not self._is_read_part_unchanged(csv_file, stat):
+                self.__init__(self.path)
+            self._inode = stat.st_ino
+            csv_file.seek(self.offset)
+            data = csv_file.read()
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+        self.offset += end
+        if len(self._head) < self.FINGERPRINT_SIZE:
+            self._head = (self._head + data[:self.FINGERPRINT_SIZE])[:self.FINGERPRINT_SIZE]
+        self._tail = (self._tail + data[max(0, end - self.FINGERPRINT_SIZE):end])[-self.FINGERPRINT_SIZE:]
+        lines = data[:end].decode('UTF-8').splitlines()
+        if self.columns is None:
+            self.columns = header_columns(lines.pop(0))
+        department_idx, team_idx, salary_idx = self.columns
+        departments = self.departments
+        added = 0
+        for row in csv.reader(lines, delimiter=';'):
+            if not row:
+                continue
+            stats = departments.get(row[department_idx])
+            if stats is None:
+                stats = departments[row[department_idx]] = DepartmentStats()
+            stats.add(row[team_idx], int(row[salary_idx]))
+            added += 1
+        if added:
+            self._summaries = {}
+        return added
+
+    def _is_read_part_unchanged(self, csv_file, stat: os.stat_result) -> bool:
+        """Whether the file still starts with the part read by previous calls"""
+        if stat.st_size < self.offset or stat.st_ino != self._inode:
+            return False
+        if csv_file.read(len(self._head)) != self._head:
+            return False
+        csv_file.seek(self.offset - len(self._tail))
+        return csv_file.read(len(self._tail)) == self._tail
+
+
+class EmployeeTable:
+    """
+    Columnar table of employees: departments and teams are stored as integer codes
+    into lists of distinct names, salaries as an int array
+    """
+
+    def __init__(self):
+        self.department_names = []
+        self.team_names = []
+        self.departments = array('i')
+        self.teams = array('i')
+        self.salaries = array('q')
+        self._department_codes = {}
+        self._team_codes = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> 'EmployeeTable':
+        """
+        The method builds a table from records about employees
+        :param rows: iterable of dictionaries with records about employees.
+        :return: table.
+        """
+        table = cls()
+        for row in rows:
+            table.append(row['Департамент'], row['Отдел'], int(row['Оклад']))
+        return table
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'EmployeeTable':
+        """
+        The method builds a table from a csv file
+        :param path: path to csv file.
+        :return: table.
+        """
+        return cls.from_rows(iter_csv_rows(path))
+
+    def __len__(self) -> int:
+        return len(self.salaries)
+
+    def append(self, department: str, team: str, salary: int) -> None:
+        """
+        The method adds an employee to the table
+        :param department: department of the employee.
+        :param team: team of the employee.
+        :param salary: salary of the employee.
+        """
+        code = self._department_codes.get(department)
+        if code is None:
+            code = self._department_codes[department] = len(self.department_names)
+            self.department_names.append(department)
+        self.departments.append(code)
+        code = self._team_codes.get(team)
+        if code is None:
+            code = self._team_codes[team] = len(self.team_names)
+            self.team_names.append(team)
+        self.teams.append(code)
+        self.salaries.append(salary)
+
+    def department_salaries(self) -> list[array]:
+        """
+        The method groups salaries by department code
+        :return: list of salary arrays indexed by department code.
+        """
+        groups = [array('q') for _ in self.department_names]
+        appends = [group.append for group in groups]
+        for code, salary in zip(self.departments, self.salaries):
+            appends[code](salary)
+        return groups
+
+    def department_teams(self) -> list[dict]:
+        """
+        The method groups distinct teams by department code
+        :return: list of ordered team sets indexed by department code.
+        """
+        groups = [{} for _ in self.department_names]
+        for department, team in dict.fromkeys(zip(self.departments, self.teams)):
+            groups[department][self.team_names[team]] = None
+        return groups
+
+    def report(self) -> 'CorpReport':
+        """
+        The method aggregates the table by department
+        :return: report.
+        """
+        report = CorpReport()
+        for name, salaries, teams in zip(self.department_names, self.department_salaries(), self.department_teams()):
+            stats = report.departments[name] = DepartmentStats()
+            stats.count = len(salaries)
+            stats.min = min(salaries)
+            stats.max = max(salaries)
+            stats.sum = sum(salaries)
+            stats.teams = teams
+            for salary in salaries:
+                stats.salaries.add(salary)
+        return report
+
+
+def menu(file: str = CORP_SUMMARY_PATH, file_out: str = REPORT_PATH) -> None:
     """
     The function displays a menu with options for the user
+    :param file: path to csv file with records about employees.
+    :param file_out: path to save the summary report to.
     """
-    file = 'C:/AAA/Corp_Summary.csv'
-    data = read_csv_to_dict(file)
+    data = IncrementalCorpReport(file)
+    data.refresh()
     is_run = True
     options = ['1', '2', '3', '0']
     while is_run:
@@ -21,12 +441,12 @@ def menu() -> None:
         while option not in options:
             print('Выберите: {}/{}/{}/{}'.format(*options))
             option = input()
+        data.refresh()
         if option == '1':
             print_hierarchy(data)
         elif option == '2':
             print_corp_report(data)
         elif option == '3':
-            file_out = 'C:/AAA/corp_report.csv'
             corp_report_to_csv(data, file_out)
         else:
             is_run = False
@@ -44,12 +464,87 @@ def read_csv_to_dict(path: str) -> list[dict]:
         return [row for row in corp_reader]
 
 
-def print_hierarchy(data: list[dict]) -> None:
+def iter_csv_rows(path: str) -> Iterator[dict]:
+    """
+    The function reads a csv file row by row without loading it into memory
+    :param path: path to csv file.
+    :return: iterator of dictionaries with records about employees.
+    """
+    with open(path, encoding='UTF-8') as csv_file:
+        yield from csv.DictReader(csv_file, delimiter=';')
+
+
+def header_columns(header: str) -> tuple[int, int, int]:
+    """
+    The function finds positions of the columns used in reports
+    :param header: first line of csv file.
+    :return: positions of department, team and salary columns.
+    """
+    header = next(csv.reader([header], delimiter=';'))
+    return header.index('Департамент'), header.index('Отдел'), header.index('Оклад')
+
+
+def split_csv(path: str, chunk_size: int = CHUNK_SIZE) -> list[tuple[int, int, tuple[int, int, int]]]:
+    """
+    The function splits a csv file into chunks on line boundaries
+    :param path: path to csv file.
+    :param chunk_size: approximate size of a chunk in bytes.
+    :return: list of (start offset, end offset, positions of department, team and salary columns).
+    """
+    with open(path, 'rb') as csv_file:
+        columns = header_columns(csv_file.readline().decode('UTF-8'))
+        size = os.fstat(csv_file.fileno()).st_size
+        bounds = [csv_file.tell()]
+        while bounds[-1] < size:
+            csv_file.seek(bounds[-1] + chunk_size)
+            csv_file.readline()
+            bounds.append(min(csv_file.tell(), size))
+    return [(start, end, columns) for start, end in zip(bounds, bounds[1:])]
+
+
+def _aggregate_chunk(path: str, start: int, end: int, columns: tuple[int, int, int]) -> CorpReport:
+    """
+    Process pool worker for CorpReport.from_csv, parses a chunk into column arrays
+    and aggregates them
+    :param path: path to csv file.
+    :param start: offset of the first line of the chunk.
+    :param end: offset after the last line of the chunk.
+    :param columns: positions of department, team and salary columns.
+    :return: report on the chunk.
+    """
+    with open(path, 'rb') as csv_file:
+        csv_file.seek(start)
+        lines = csv_file.read(end - start).decode('UTF-8').splitlines()
+    department_idx, team_idx, salary_idx = columns
+    table = EmployeeTable()
+    for row in csv.reader(lines, delimiter=';'):
+        if row:
+            table.append(row[department_idx], row[team_idx], int(row[salary_idx]))
+    return table.report()
+
+
+def as_report(data: Iterable[dict] | EmployeeTable | CorpReport) -> CorpReport:
+    """
+    The function aggregates records about employees unless they are already aggregated
+    :param data: records about employees, table or report.
+    :return: report.
+    """
+    if isinstance(data, CorpReport):
+        return data
+    if isinstance(data, EmployeeTable):
+        return data.report()
+    return CorpReport.from_rows(data)
+
+
+def print_hierarchy(data: Iterable[dict] | EmployeeTable | CorpReport) -> None:
     """
     The function print a hierarchy of teams for each department
-    :param data: list of dictionaries with records about employees.
+    :param data: records about employees, table or report.
     """
-    departments = get_departments(data)
+    if isinstance(data, CorpReport):
+        departments = data.hierarchy()
+    else:
+        departments = get_departments(data)
     for department in departments:
         print(f'Департамент: {department}')
         print('{:>12}'.format('Команды:'))
@@ -58,48 +553,56 @@ def print_hierarchy(data: list[dict]) -> None:
         print('')
 
 
-def get_departments(data: list[dict]) -> dict[str, list]:
+def get_departments(data: list[dict] | EmployeeTable) -> dict[str, list]:
     """
     The function returns a list of teams for each department
-    :param data: list of dictionaries with records about employees.
+    :param data: list of dictionaries with records about employees or table.
     :return: dictionary {department: teams}.
     """
+    if isinstance(data, EmployeeTable):
+        return {name: list(teams) for name, teams in zip(data.department_names, data.department_teams())}
     departments = {}
     for row in data:
-        if row['Департамент'] not in departments.keys():
-            departments[row['Департамент']] = []
-            departments[row['Департамент']].append(row['Отдел'])
-        else:
-            if row['Отдел'] not in departments[row['Департамент']]:
-                departments[row['Департамент']].append(row['Отдел'])
-    return departments
+        departments.setdefault(row['Департамент'], {})[row['Отдел']] = None
+    return {department: list(teams) for department, teams in departments.items()}
 
 
-def print_corp_report(data: list[dict]) -> None:
+def print_corp_report(data: Iterable[dict] | EmployeeTable | CorpReport,
+                      percentiles: Iterable[float] = ()) -> None:
     """
     The function print a summary report by department
-    :param data: list of dictionaries with records about employees.
-    """
-    departments_salaries = get_department_salaries(data)
-    departments_summary = get_departments_summary(departments_salaries)
-    print('', '-' * 74, '')
-    print('|{:^15}|{:^20}|{:^18}|{:^18}|'.format('Департамент',
-                                                 'Кол-во сотрудников',
-                                                 'Вилка зарплаты',
-                                                 'Средняя зарплата'))
-    print('|{:-^15}|{:-^20}|{:-^18}|{:-^18}|'.format('', '', '', ''))
+    :param data: records about employees, table or report.
+    :param percentiles: additional salary percentiles to print, from 0 to 100.
+    """
+    percentiles = tuple(percentiles)
+    departments_summary = as_report(data).summary(percentiles)
+    widths = [15, 20, 18, 18, 20] + [12] * len(percentiles)
+    line = '|' + ''.join(f'{{:^{width}}}|' for width in widths)
+    print('', '-' * (sum(widths) + len(widths) - 1), '')
+    print(line.format(*report_fieldnames(percentiles)))
+    print(line.replace(':', ':-').format(*[''] * len(widths)))
     for k, v in departments_summary.items():
-        num_workers, fork_salary, mean_salary = v
-        print('|{:^15}|{:^20}|{:^18}|{:^18}|'.format(k, num_workers, fork_salary, mean_salary))
-    print('', '¯' * 74, '')
+        print(line.format(k, *v))
+    print('', '¯' * (sum(widths) + len(widths) - 1), '')
 
 
-def get_department_salaries(data: list[dict]) -> dict[str, list]:
+def report_fieldnames(percentiles: Iterable[float] = ()) -> list[str]:
+    """
+    The function returns column names of the summary report
+    :param percentiles: additional salary percentiles, from 0 to 100.
+    :return: list of column names.
+    """
+    return FIELDNAMES + [f'P{p:g}' for p in percentiles]
+
+
+def get_department_salaries(data: list[dict] | EmployeeTable) -> dict[str, list]:
     """
     The function returns a list of salaries for each department
-    :param data: list of dictionaries with records about employees.
+    :param data: list of dictionaries with records about employees or table.
     :return: dictionary {department: salaries}.
     """
+    if isinstance(data, EmployeeTable):
+        return dict(zip(data.department_names, data.department_salaries()))
     departments_salaries = {}
     for row in data:
         if row['Департамент'] not in departments_salaries.keys():
@@ -108,14 +611,19 @@ def get_department_salaries(data: list[dict]) -> dict[str, list]:
     return departments_salaries
 
 
-def get_departments_summary(departments_salaries: dict[str, list]) -> dict[str, list]:
+def get_departments_summary(departments_salaries: dict[str, list] | EmployeeTable,
+                            percentiles: Iterable[float] = ()) -> dict[str, list]:
     """
     The function returns a list with
-    summary statistics (number of workers, fork salary, mean salary)
-    for each department
-    :param departments_salaries: dictionary {department: salaries}.
+    summary statistics (number of workers, fork salary, mean salary, median salary
+    and requested percentiles) for each department.
+    Median and percentiles are estimated with streaming quantile sketches
+    :param departments_salaries: dictionary {department: salaries} or table.
+    :param percentiles: additional salary percentiles to compute, from 0 to 100.
     :return: dictionary {department: summary statistics}.
     """
+    if isinstance(departments_salaries, EmployeeTable):
+        return departments_salaries.report().summary(percentiles)
     departments_summary = {}
     for department in departments_salaries:
         num_workers = len(departments_salaries[department])
@@ -124,30 +632,221 @@ def get_departments_summary(departments_salaries: dict[str, list]) -> dict[str,
         fork_salary = str(min_salary) + '–' + str(max_salary)
         sum_salary = sum(departments_salaries[department])
         mean_salary = f'{sum_salary / num_workers:.2f}'
-        departments_summary[department] = [num_workers, fork_salary, mean_salary]
+        sketch = QuantileSketch()
+        for salary in departments_salaries[department]:
+            sketch.add(salary)
+        quantiles = [f'{sketch.quantile(p / 100):.2f}' for p in (50, *percentiles)]
+        departments_summary[department] = [num_workers, fork_salary, mean_salary, *quantiles]
     return departments_summary
 
 
-def corp_report_to_csv(data: list[dict], file_out: str) -> None:
+def corp_report_to_csv(data: Iterable[dict] | EmployeeTable | CorpReport, file_out: str,
+                       percentiles: Iterable[float] = ()) -> None:
     """
     The function saves a summary report on departments in a csv file
-    :param data: list of dictionaries with records about employees
+    :param data: records about employees, table or report.
     :param file_out: path to csv file.
+    :param percentiles: additional salary percentiles to save, from 0 to 100.
     """
-    departments_salaries = get_department_salaries(data)
-    departments_summary = get_departments_summary(departments_salaries)
+    percentiles = tuple(percentiles)
+    departments_summary = as_report(data).summary(percentiles)
     with open(file_out, 'w', newline='') as csvfile:
-        fieldnames = ['Департамент', 'Кол-во сотрудников', 'Вилка зарплаты', 'Средняя зарплата']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
-        writer.writeheader()
-        for department in departments_summary:
-            writer.writerow({'Департамент': department,
-                             'Кол-во сотрудников': departments_summary[department][0],
-                             'Вилка зарплаты': departments_summary[department][1],
-                             'Средняя зарплата': departments_summary[department][2]
-                             })
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(report_fieldnames(percentiles))
+        for department, summary in departments_summary.items():
+            writer.writerow([department, *summary])
     print(f'Файл c отчетом успешно сохранен в {file_out}.\n')
 
 
+def corp_report_to_json(data: Iterable[dict] | EmployeeTable | CorpReport, file_out: str,
+                        percentiles: Iterable[float] = ()) -> None:
+    """
+    The function saves a summary report on departments in a json file
+    :param data: records about employees, table or report.
+    :param file_out: path to json file.
+    :param percentiles: additional salary percentiles to save, from 0 to 100.
+    """
+    percentiles = tuple(percentiles)
+    fieldnames = report_fieldnames(percentiles)[1:]
+    departments_summary = as_report(data).summary(percentiles)
+    report = {department: dict(zip(fieldnames, summary)) for department, summary in departments_summary.items()}
+    with open(file_out, 'w', encoding='UTF-8') as json_file:
+        json.dump(report, json_file, ensure_ascii=False, indent=2)
+    print(f'Файл c отчетом успешно сохранен в {file_out}.\n')
+
+
+REPORT_WRITERS = {'csv': corp_report_to_csv, 'json': corp_report_to_json}
+
+
+def save_report(file_in: str, file_out: str, fmt: str = 'csv',
+                percentiles: Iterable[float] = (), n_jobs: int | None = 1) -> str:
+    """
+    The function aggregates a csv file and saves the summary report
+    :param file_in: path to csv file with records about employees.
+    :param file_out: path to the report.
+    :param fmt: format of the report, csv or json.
+    :param percentiles: additional salary percentiles to save, from 0 to 100.
+    :param n_jobs: number of processes to aggregate the file with.
+    :return: path to the report.
+    """
+    REPORT_WRITERS[fmt](CorpReport.from_csv(file_in, n_jobs), file_out, percentiles)
+    return file_out
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    The function runs the interactive menu without arguments,
+    or builds reports for csv files given on the command line
+    :param argv: command line arguments.
+    """
+    parser = argparse.ArgumentParser(description='Сводный отчёт по департаментам')
+    parser.add_argument('inputs', nargs='*', help='csv файлы с данными о сотрудниках')
+    parser.add_argument('-o', '--output', help='файл отчёта, если передан один csv файл')
+    parser.add_argument('-d', '--output-dir', default='.', help='папка для отчётов <имя файла>_report.<формат>')
+    parser.add_argument('-f', '--format', choices=REPORT_WRITERS, default='csv')
+    parser.add_argument('-p', '--percentiles', type=_percentile, action='append', default=[],
+                        help='дополнительный процентиль зарплат от 0 до 100, можно повторять: -p 90 -p 99')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='число процессов, 0 - все ядра')
+    parser.add_argument('--self-test', action='store_true', help='проверить модуль на временных csv файлах')
+    args = parser.parse_args(argv)
+    if args.self_test:
+        _self_test()
+        return
+    if not args.inputs:
+        menu()
+        return
+    if args.output and len(args.inputs) > 1:
+        parser.error('--output can only be used with a single input file')
+
+    n_jobs = args.jobs or os.cpu_count()
+    if not args.output:
+        os.makedirs(args.output_dir, exist_ok=True)
+    if len(args.inputs) == 1:
+        file_out = args.output or _report_path(args.inputs[0], args.output_dir, args.format)
+        save_report(args.inputs[0], file_out, args.format, args.percentiles, n_jobs)
+        return
+    files_out = [_report_path(file_in, args.output_dir, args.format) for file_in in args.inputs]
+    targets = {}
+    for file_in, file_out in zip(args.inputs, files_out):
+        other = targets.setdefault(os.path.normcase(os.path.abspath(file_out)), file_in)
+        if other != file_in:
+            parser.error(f'reports on {other} and {file_in} would both be saved to {file_out}, '
+                         'rename the files or build the reports separately')
+    with ProcessPoolExecutor(n_jobs) as executor:
+        list(executor.map(save_report, args.inputs, files_out, repeat(args.format), repeat(args.percentiles)))
+
+
+def _percentile(value: str) -> float:
+    """Argparse type of a percentile from 0 to 100"""
+    try:
+        percentile = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value!r} is not a number')
+    if not 0 <= percentile <= 100:
+        raise argparse.ArgumentTypeError(f'percentile must be between 0 and 100, got {value}')
+    return percentile
+
+
+def _report_path(file_in: str, output_dir: str, fmt: str) -> str:
+    """Path to the report on file_in in output_dir"""
+    stem = os.path.splitext(os.path.basename(file_in))[0]
+    return os.path.join(output_dir, f'{stem}_report.{fmt}')
+
+
+def _self_test() -> None:
+    """
+    The function checks the sketch, parallel and incremental aggregation
+    and the command line on temporary csv files
+    """
+    import contextlib
+    import io
+    import random
+    import statistics
+    import tempfile
+
+    sketch = QuantileSketch()
+    for value in range(1, 102):
+        sketch.add(value)
+    assert sketch.exact and sketch.quantile(0.5) == 51 and sketch.quantile(0.25) == 26
+    even = QuantileSketch()
+    for value in (4, 1, 3, 2):
+        even.add(value)
+    assert even.quantile(0.5) == statistics.median([4, 1, 3, 2])
+    low, high, whole = QuantileSketch(max_size=10), QuantileSketch(max_size=10), QuantileSketch(max_size=10)
+    for value in range(1, 10001):
+        (low if value <= 5000 else high).add(value)
+        whole.add(value)
+    assert not low.exact and abs(low.quantile(0.5) - 2500.5) <= 2500.5 * low.alpha
+    low.merge(high)
+    assert low.count == 10000 and low.counts == whole.counts
+    assert abs(low.quantile(0.5) - 5000.5) <= 5000.5 * low.alpha
+    exact = QuantileSketch(max_size=10)
+    exact.add(7)
+    exact.merge(whole)
+    assert not exact.exact and exact.count == 10001
+
+    header = 'ФИО полностью;Должность;Департамент;Отдел;Оценка;Оклад\n'
+    rng = random.Random(0)
+    rows = [f'Сотрудник {i};Инженер;Департамент {rng.randrange(4)};Отдел {rng.randrange(3)};4;'
+            f'{rng.randrange(50, 150) * 1000}\n' for i in range(3000)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Corp_Summary.csv')
+        with open(path, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + ''.join(rows))
+
+        chunks = split_csv(path, chunk_size=4096)
+        assert chunks[0][0] == len(header.encode('UTF-8')) and chunks[-1][1] == os.path.getsize(path)
+        assert all(end == start for (_, end, _), (start, _, _) in zip(chunks, chunks[1:]))
+        serial = CorpReport.from_csv(path).summary((90,))
+        assert CorpReport.from_csv(path, n_jobs=2, chunk_size=4096).summary((90,)) == serial
+        assert EmployeeTable.from_csv(path).report().summary((90,)) == serial
+        assert get_departments_summary(get_department_salaries(read_csv_to_dict(path)), (90,)) == serial
+        for department, salaries in get_department_salaries(read_csv_to_dict(path)).items():
+            assert float(serial[department][3]) == statistics.median(salaries)
+
+        growing = os.path.join(directory, 'growing.csv')
+        with open(growing, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + ''.join(rows[:100]) + rows[100][:10])
+        report = IncrementalCorpReport(growing)
+        assert report.refresh() == 100 and report.refresh() == 0
+        with open(growing, 'a', encoding='UTF-8') as csv_file:
+            csv_file.write(rows[100][10:] + ''.join(rows[101:]))
+        assert report.refresh() == 2900 and report.summary((90,)) == serial
+        with open(growing, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + ''.join(rows[:5]))
+        assert report.refresh() == 5 and sum(stats.count for stats in report.departments.values()) == 5
+        with open(growing, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + ''.join(rows[:5]).replace('Департамент', 'Подразделен'))
+        assert report.refresh() == 5 and all(name.startswith('Подразделен') for name in report.departments)
+        with open(growing, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + 'Ёж;Инженер;Отдел Ё;Ж;4;100000\n')
+        assert report.refresh() == 1
+        with open(growing, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header + 'Щука;Инженер;Ёлка;Ж;4;100000\nЯщер;Инженер;Ёлка;Ж;4;120000\n')
+        assert report.refresh() == 2 and list(report.summary()) == ['Ёлка']
+
+        header_only = os.path.join(directory, 'header_only.csv')
+        with open(header_only, 'w', encoding='UTF-8') as csv_file:
+            csv_file.write(header)
+        assert CorpReport.from_csv(header_only).summary() == {}
+        assert CorpReport.from_csv(header_only, n_jobs=2).summary() == {}
+
+        out_dir = os.path.join(directory, 'reports')
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            main(['-p', '90', '-p', '99', path, '-d', out_dir, '-f', 'json'])
+            for argv in ([path, '-p', '150'], [path, os.path.join(out_dir, '..', 'Corp_Summary.csv'), '-d', out_dir]):
+                try:
+                    main(argv)
+                except SystemExit as error:
+                    assert error.code == 2
+                else:
+                    assert False, f'{argv} must be rejected'
+        with open(os.path.join(out_dir, 'Corp_Summary_report.json'), encoding='UTF-8') as json_file:
+            saved = json.load(json_file)
+        assert list(saved) == list(serial) and saved['Департамент 0']['P90'] == serial['Департамент 0'][4]
+        assert list(saved['Департамент 0'])[-2:] == ['P90', 'P99']
+    print('Все проверки пройдены.')
+
+
 if __name__ == '__main__':
-    menu()
+    main(sys.argv[1:])
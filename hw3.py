@@ -1,11 +1,26 @@
 from collections import Counter
+from typing import Callable
+
+from cw1 import Tokenizer, limit_features, prunes
 
 
 class CountVectorizer:
     """Convert a text corpus to a matrix of words counts."""
 
-    def __init__(self):
+    def __init__(self, tokenizer: Callable[[str], list[str]] | None = None,
+                 min_df: int | float = 1, max_df: int | float = 1.0, max_features: int | None = None):
+        """
+        :param tokenizer: callable splitting a sentence into tokens, Tokenizer() by default
+        :param min_df: drop words found in fewer documents, float is a fraction of corpus
+        :param max_df: drop words found in more documents, float is a fraction of corpus
+        :param max_features: keep only this many most frequent words
+        Vocabulary pruning is applied by fit and fit_transform, not by partial_fit
+        """
         self.feature_names = {}
+        self.tokenizer = tokenizer or Tokenizer()
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
 
     def get_feature_names(self) -> list[str]:
         """
@@ -20,15 +35,47 @@ class CountVectorizer:
         :param corpus: list of strings
         :return: list of words
         """
-        idx = 0
+        idx = len(self.feature_names)
         for sentence in corpus:
-            sentence = sentence.lower().split(' ')
+            sentence = self.tokenizer(sentence)
             for word in sentence:
                 if word not in self.feature_names.keys():
                     self.feature_names[word] = idx
                     idx += 1
         return self.feature_names
 
+    def fit(self, corpus: list[str]) -> 'CountVectorizer':
+        """
+        Learn vocabulary from corpus, the previous vocabulary is discarded
+        :param corpus: list of strings
+        :return: fitted vectorizer
+        """
+        if prunes(self.min_df, self.max_df, self.max_features):
+            self.fit_transform(corpus)
+            return self
+        self.feature_names = {}
+        self.set_feature_names(corpus)
+        return self
+
+    def partial_fit(self, corpus: list[str]) -> 'CountVectorizer':
+        """
+        Extend vocabulary with new words from corpus,
+        existing words keep their columns
+        :param corpus: list of strings
+        :return: fitted vectorizer
+        """
+        self.set_feature_names(corpus)
+        return self
+
+    def transform(self, corpus: list[str]) -> list[list[int]]:
+        """
+        Generate count matrix with the learned vocabulary,
+        words missing from the vocabulary are ignored
+        :param corpus: list of strings
+        :return: count matrix for corpus
+        """
+        return self._count([self.tokenizer(sentence) for sentence in corpus])
+
     def fit_transform(self, corpus: list[str]) -> list[list[int]]:
         """
         Generate count matrix, each row corresponds to sentence in corpus,
@@ -36,14 +83,36 @@ class CountVectorizer:
         :param corpus: list of strings
         :return: count matrix for corpus
         """
+        tokens = [self.tokenizer(sentence) for sentence in corpus]
+        self.feature_names = {}
+        for sentence in tokens:
+            for word in sentence:
+                if word not in self.feature_names:
+                    self.feature_names[word] = len(self.feature_names)
+        matrix = self._count(tokens)
+        if prunes(self.min_df, self.max_df, self.max_features):
+            doc_freq = [sum(map(bool, column)) for column in zip(*matrix)]
+            term_freq = [sum(column) for column in zip(*matrix)]
+            kept = limit_features(doc_freq, term_freq, len(matrix),
+                                  self.min_df, self.max_df, self.max_features)
+            words = self.get_feature_names()
+            self.feature_names = {words[j]: idx for idx, j in enumerate(kept)}
+            matrix = [[row[j] for j in kept] for row in matrix]
+        return matrix
+
+    def _count(self, tokens: list[list[str]]) -> list[list[int]]:
+        """
+        Count words of the vocabulary in each tokenized sentence
+        :param tokens: list of tokenized sentences
+        :return: count matrix
+        """
         matrix = []
-        self.set_feature_names(corpus)
-        for sentence in corpus:
-            sentence = sentence.lower().split(' ')
+        for sentence in tokens:
             feature_freq = [0] * len(self.feature_names)
             cnt = Counter(sentence)
             for k in cnt.keys():
-                feature_freq[self.feature_names[k]] = cnt[k]
+                if k in self.feature_names:
+                    feature_freq[self.feature_names[k]] = cnt[k]
             matrix.append(feature_freq)
         return matrix
 
@@ -97,3 +166,18 @@ if __name__ == '__main__':
     count_matrix5 = vectorizer5.fit_transform(corpus5)
     assert vectorizer5.get_feature_names() == []
     assert count_matrix5 == []
+
+    vectorizer6 = CountVectorizer().fit(corpus4)
+    assert vectorizer6.transform(['Avito Python avito']) == [[2, 0]]
+    vectorizer6.partial_fit(['Python avito'])
+    assert vectorizer6.get_feature_names() == ['avito', 'otiva', 'python']
+    assert vectorizer6.transform(['Avito Python avito']) == [[2, 0, 1]]
+    assert vectorizer6.fit_transform(corpus3) == [[1]]
+
+    vectorizer7 = CountVectorizer(tokenizer=Tokenizer(stop_words={'the', 'is'}), min_df=2, max_features=3)
+    assert vectorizer7.fit_transform(corpus2) == [[1, 1, 1], [1, 0, 2], [1, 0, 0], [1, 1, 1]]
+    assert vectorizer7.get_feature_names() == ['this', 'first', 'document']
+    vectorizer8 = CountVectorizer(tokenizer=Tokenizer(ngram_range=(2, 2)), max_df=0.5)
+    assert vectorizer8.fit_transform(['Avito,  Otiva', 'avito avito']) == [[1, 0], [0, 1]]
+    assert CountVectorizer(max_df=1).fit_transform(['a b', 'a c', 'a d']) == [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    assert CountVectorizer(min_df=1.0).fit_transform(['a b', 'a c', 'a d']) == [[1], [1], [1]]
@@ -1,15 +1,24 @@
 import json
 import keyword
+import re
 import functools
+import os
+import sys
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from typing import Callable
 
 
 class ColorizeMixin:
     """Changes the color of the text when output to the console"""
+    __slots__ = ()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
-        cls.__repr__ = cls._replace_color(cls.__repr__)
+        if '__repr__' in cls.__dict__:
+            cls.__repr__ = cls._replace_color(cls.__repr__)
 
     @classmethod
     def _replace_color(cls, func: Callable) -> Callable:
@@ -48,9 +57,16 @@ class Advert(ColorizeMixin):
         self._price = value
 
     def __getattr__(self, name):
+        """
+        Wrap nested value on first access and memoize it in the instance,
+        so next reads of the attribute are plain attribute lookups
+        """
+        if name == 'data' or name.startswith('__'):
+            raise AttributeError(name)
         if hasattr(self.data, name):
             return getattr(self.data, name)
-        return Advert.build(self.data[name])
+        value = self.__dict__[name] = Advert.build(self.data[name])
+        return value
 
     @classmethod
     def build(cls, obj):
@@ -62,10 +78,268 @@ class Advert(ColorizeMixin):
         else:
             return obj
 
+    @staticmethod
+    def compile(schema, name="CompiledAdvert"):
+        """
+        Generate a class with __slots__ for the keys of schema and an __init__
+        that assigns them directly. Schema is a sample mapping, whose nested mappings
+        (and lists of them) get their own generated classes wrapped lazily on first
+        access, or an iterable of keys.
+        Keys missing from the schema, or not valid identifiers, are kept in a dict
+        """
+        if isinstance(schema, Mapping):
+            keys = list(schema)
+        else:
+            keys, schema = list(schema), {}
+        fields = {}
+        for key in keys:
+            attr = key + "_" if keyword.iskeyword(key) else key
+            if attr.isidentifier() and (attr == "price" or not hasattr(SlottedAdvert, attr)):
+                fields[key] = (attr, _nested_class(schema.get(key), f"{name}_{attr}"))
+        return type(name, (SlottedAdvert,), _compile_namespace(fields))
+
     def __repr__(self):
         return f'{self.title} | {self.price} ₽'
 
 
+class SlottedAdvert(ColorizeMixin):
+    """Base of classes generated by Advert.compile, known keys are stored in slots"""
+    __slots__ = ("_price", "_extra")
+    repr_color_code = 33
+    FIELDS = {}
+
+    @property
+    def price(self):
+        return self._price
+
+    @price.setter
+    def price(self, value):
+        if value < 0:
+            raise ValueError("Price must be >=0")
+        self._price = value
+
+    def _set_extra(self, mapping):
+        """Keep values of keys missing from the schema"""
+        self._extra = {key + "_" if keyword.iskeyword(key) else key: value
+                       for key, value in mapping.items() if key not in self.FIELDS}
+
+    def __getattr__(self, name):
+        """Keys missing from the schema are looked up in the extra fields"""
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._extra is None or name not in self._extra:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return Advert.build(self._extra[name])
+
+    @classmethod
+    def build(cls, obj):
+        """Method for processing nested structures"""
+        if isinstance(obj, dict):
+            return cls(obj)
+        elif isinstance(obj, list):
+            return [cls.build(item) for item in obj]
+        else:
+            return obj
+
+    def __repr__(self):
+        return f'{self.title} | {self.price} ₽'
+
+
+def _nested_class(sample, name):
+    """Generated class for a nested mapping or a list of mappings in a sample"""
+    if isinstance(sample, list):
+        items = [item for item in sample if isinstance(item, dict)]
+        sample = {key: value for item in items for key, value in item.items()} if items else None
+    if isinstance(sample, dict):
+        return Advert.compile(sample, name)
+    return None
+
+
+def _compile_namespace(fields):
+    """Slots, __init__ and lazy properties of a generated class, compiled once per class"""
+    namespace = {"wrap": _wrap, "containers": frozenset((dict, list))}
+    slots = []
+    lines = ["def __init__(self, mapping):",
+             "    self._price = 0",
+             "    self._extra = None",
+             "    found = 0"]
+    for i, (key, (attr, nested)) in enumerate(fields.items()):
+        if nested is None:
+            if attr != "price":
+                slots.append(attr)
+            lines += [f"    if {key!r} in mapping:",
+                      f"        value = mapping[{key!r}]",
+                      f"        self.{attr} = wrap(value) if type(value) in containers else value",
+                      "        found += 1"]
+        else:
+            slots += [f"_raw_{attr}", f"_cache_{attr}"]
+            namespace[f"nested_{i}"] = nested.build
+            lines += [f"    if {key!r} in mapping:",
+                      f"        self._raw_{attr} = mapping[{key!r}]",
+                      "        found += 1"]
+    lines += ["    if found != len(mapping):",
+              "        self._set_extra(mapping)"]
+    for i, (key, (attr, nested)) in enumerate(fields.items()):
+        if nested is not None:
+            lines += [f"def get_{i}(self):",
+                      "    try:",
+                      f"        return self._cache_{attr}",
+                      "    except AttributeError:",
+                      f"        value = self._cache_{attr} = nested_{i}(self._raw_{attr})",
+                      f"        del self._raw_{attr}",
+                      "        return value"]
+    exec("\n".join(lines), namespace)
+    result = {"__slots__": tuple(slots), "__init__": namespace["__init__"], "FIELDS": fields}
+    for i, (key, (attr, nested)) in enumerate(fields.items()):
+        if nested is not None:
+            result[attr] = property(namespace[f"get_{i}"])
+    return result
+
+
+def _wrap(value):
+    """Wrap nested mappings of a value missing from the sample schema"""
+    if isinstance(value, dict) or (isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value)):
+        return Advert.build(value)
+    return value
+
+
+def load_adverts(path, cls=Advert, batch_size=None, n_jobs=1, on_error=None):
+    """
+    Lazily load adverts from a JSON Lines file or a file with a JSON array.
+    Records that are not valid JSON objects or fail the price check are reported
+    to on_error(index, error) and skipped. With n_jobs > 1 records are parsed
+    in a process pool, cls must then be importable by worker processes
+    :param path: path to the feed
+    :param cls: class to build adverts with, Advert or a class from Advert.compile
+    :param batch_size: yield lists of this many adverts instead of single adverts
+    :param n_jobs: number of processes, None uses all cores
+    :param on_error: callback for skipped records, by default they are printed to stderr
+    :return: iterator of adverts or of lists of adverts
+    """
+    on_error = on_error or _print_error
+    adverts = _iter_loaded(path, cls, n_jobs or os.cpu_count(), on_error)
+    if batch_size is None:
+        return adverts
+    return iter(lambda: list(islice(adverts, batch_size)), [])
+
+
+def _iter_loaded(path, cls, n_jobs, on_error):
+    """Adverts of the feed in file order"""
+    with open(path, encoding="UTF-8") as feed:
+        head = feed.read(1)
+        while head.isspace():
+            head = feed.read(1)
+        if head == "[":
+            records = _iter_json_array(feed)
+        else:
+            records = (line for line in _prepend(head, feed) if line.strip())
+        if n_jobs == 1:
+            yield from _build_all(enumerate(records), cls, on_error)
+            return
+        with ProcessPoolExecutor(n_jobs) as executor:
+            pending = deque()
+            batches = enumerate(iter(lambda: list(islice(records, 1000)), []))
+            for number, batch in batches:
+                pending.append(executor.submit(_build_batch, number * 1000, batch, cls))
+                if len(pending) > 2 * n_jobs:
+                    yield from _report(pending.popleft().result(), on_error)
+            while pending:
+                yield from _report(pending.popleft().result(), on_error)
+
+
+def _build(record, cls):
+    """Advert from the JSON text of a record"""
+    mapping = json.loads(record)
+    if not isinstance(mapping, dict):
+        raise ValueError(f"Advert must be a JSON object, got {type(mapping).__name__}")
+    return cls(mapping)
+
+
+def _build_all(records, cls, on_error):
+    """Build adverts from (index, record) pairs, reporting failed records"""
+    for index, record in records:
+        try:
+            yield _build(record, cls)
+        except (ValueError, TypeError) as error:
+            on_error(index, error)
+
+
+def _build_batch(start, records, cls):
+    """Process pool worker for load_adverts, returns adverts and (index, error) pairs"""
+    results = []
+    for index, record in enumerate(records, start):
+        try:
+            results.append(_build(record, cls))
+        except (ValueError, TypeError) as error:
+            results.append((index, error))
+    return results
+
+
+def _report(results, on_error):
+    """Yield adverts of a worker batch, reporting failed records"""
+    for result in results:
+        if isinstance(result, tuple):
+            on_error(*result)
+        else:
+            yield result
+
+
+def _iter_json_array(feed, chunk_size=1 << 16):
+    """
+    JSON texts of the items of an array, the opening bracket is already read.
+    Items are only split here, so a malformed item becomes one bad record,
+    an item with unbalanced brackets swallows the rest of the feed
+    """
+    buffer, pos, eof = "", 0, False
+    while True:
+        end = _item_end(buffer, pos)
+        if end is None:
+            if eof:
+                if buffer[pos:].strip():
+                    yield buffer[pos:]
+                return
+            chunk = feed.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        if buffer[pos:end].strip():
+            yield buffer[pos:end]
+        if buffer[end] == "]":
+            return
+        pos = end + 1
+
+
+_ARRAY_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[][{},"]')
+
+
+def _item_end(buffer, pos):
+    """Position of the comma or bracket that ends the array item at pos, None if it is not in buffer"""
+    depth = 0
+    for match in _ARRAY_TOKEN.finditer(buffer, pos):
+        token = match.group()
+        if token == '"':
+            return None
+        if token[0] == '"':
+            continue
+        if token in "[{":
+            depth += 1
+        elif token in "]}" and depth:
+            depth -= 1
+        elif not depth:
+            return match.start()
+    return None
+
+
+def _prepend(first, feed):
+    """Lines of feed with the already read first character restored"""
+    lines = iter(feed)
+    yield first + next(lines, "")
+    yield from lines
+
+
+def _print_error(index, error):
+    print(f"Skipped advert #{index}: {error}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     test1 = """{
     "title" : "iPhone X",
@@ -115,3 +389,57 @@ if __name__ == "__main__":
     corgi = Advert(ad4)
     assert corgi.class_ == "dogs"
     print(corgi)
+
+    CompiledAd = Advert.compile(ad4)
+    compiled_corgi = CompiledAd(ad4)
+    assert compiled_corgi.class_ == "dogs"
+    assert compiled_corgi.location.address == corgi.location.address
+    assert compiled_corgi.location is compiled_corgi.location
+    assert not hasattr(compiled_corgi, "__dict__")
+    assert repr(compiled_corgi) == repr(corgi)
+    compiled_iphone = CompiledAd(ad1)
+    assert compiled_iphone.location.metro_stations == ["Спортивная", "Гагаринская"]
+    assert CompiledAd(ad3).price == 0
+    try:
+        CompiledAd(ad2)
+    except ValueError as error:
+        assert str(error) == "Price must be >=0"
+    assert Advert.compile(["title", "price"])(ad1).location.address == iphone_ad.location.address
+    assert Advert.compile({"title": "", "build": 1, "metro-line": 2})({"metro-line": 3}).FIELDS.keys() == {"title"}
+
+    location = iphone_ad.location
+    assert iphone_ad.location is location
+    assert location.metro_stations is iphone_ad.location.metro_stations
+
+    import io
+    import tempfile
+    feed_dir = tempfile.mkdtemp()
+    errors = []
+    lines_path = os.path.join(feed_dir, "feed.jsonl")
+    with open(lines_path, "w", encoding="UTF-8") as feed_file:
+        feed_file.write("\n".join(json.dumps(json.loads(ad)) for ad in (test1, test2, test3, test4)) + "\n\n{oops\n")
+    loaded = list(load_adverts(lines_path, on_error=lambda index, error: errors.append(index)))
+    assert [ad.title for ad in loaded] == ["iPhone X", "python", "Вельш-корги"]
+    assert errors == [1, 4]
+    array_path = os.path.join(feed_dir, "feed.json")
+    with open(array_path, "w", encoding="UTF-8") as feed_file:
+        feed_file.write(" [\n" + ",\n".join([test1, test3, test4] * 50) + "]")
+    batches = list(load_adverts(array_path, cls=CompiledAd, batch_size=40))
+    assert [len(batch) for batch in batches] == [40, 40, 40, 30]
+    assert batches[-1][-1].class_ == "dogs"
+    parallel = list(load_adverts(lines_path, n_jobs=2, on_error=lambda index, error: errors.append(index)))
+    assert [ad.title for ad in parallel] == ["iPhone X", "python", "Вельш-корги"] and errors == [1, 4, 1, 4]
+
+    bad_path = os.path.join(feed_dir, "bad.jsonl")
+    with open(bad_path, "w", encoding="UTF-8") as feed_file:
+        feed_file.write('{"title": "x", "price": "x"}\n[1, 2]\n' + json.dumps(json.loads(test1)) + "\n")
+    errors = []
+    loaded = list(load_adverts(bad_path, on_error=lambda index, error: errors.append(index)))
+    assert [ad.title for ad in loaded] == ["iPhone X"]
+    assert errors == [0, 1]
+    with open(array_path, "w", encoding="UTF-8") as feed_file:
+        feed_file.write('[{"title": "a, [b]", "price": 1}, {"title": }, 7, {"title": "\\"c\\"", "price": 2}]')
+    errors = []
+    loaded = list(load_adverts(array_path, on_error=lambda index, error: errors.append(index)))
+    assert [ad.title for ad in loaded] == ["a, [b]", '"c"'] and errors == [1, 2]
+    assert list(_iter_json_array(io.StringIO(' {"a": [1, "]"]} ,2 ]'), chunk_size=3)) == [' {"a": [1, "]"]} ', "2 "]
@@ -1,87 +1,364 @@
 # Guido van Rossum <guido@python.org>
+import argparse
+import asyncio
+import json
+import os
+import random
+import string
+import sys
+import time
+from collections import deque
 
-def step1():
-    print(
-        'Утка-маляр 🦆 решила выпить зайти в бар. '
-        'Взять ей зонтик? ☂️'
-    )
-    option = ''
-    options = {'да': True, 'нет': False}
-    while option not in options:
-        print('Выберите: {}/{}'.format(*options))
-        option = input().lower()
-    if options[option]:
-        return step2_umbrella()
-    return step2_no_umbrella()
-
-
-def step2_umbrella():
-    print(
-        'Пошел дождь и зонтик пригодился ☔. Довольная утка зашла в бар.'
-    )
-    return step3_bar()
-
-
-def step2_no_umbrella():
-    print(
-        'На небе не было ни облачка ☀. Довольная утка зашла в бар.'
-    )
-    return step3_bar()
-
-
-def step3_bar():
-    print(
-        'Что заказать утке?'
-    )
-    option = ''
-    options = {'виски', 'шампанское', 'пиво'}
-    while option not in options:
-        print('Выберите: {}/{}/{}'.format(*options))
-        option = input().lower()
-    return step4_order(option)
-
-
-def step4_order(option):
-    print(
-        f'{option.capitalize()} понравилось утке. '
-        'Бармен подходит к ней и предлагает повторить заказ.\n'
-        'Повторить заказ?'
-    )
-    option = ''
-    options = {'да': True, 'нет': False}
-    while option not in options:
-        print('Выберите: {}/{}'.format(*options))
-        option = input().lower()
-
-    if options[option]:
-        return step5_drink()
-    return step5_no_drink()
-
-
-def step5_drink():
-    print(
-        'Бармен уходит за напитком.\n'
-        'Когда он возращается, утки уже нет, а на барной стойке лежат 10$ 💵.\n'
-    )
-    return step6_end()
-
-
-def step5_no_drink():
-    print(
-        'Утка платит 10$ 💵 и тут же исчезает.\n'
-    )
-    return step6_end()
-
-
-def step6_end():
-    print(
-        '❗ Срочные новости! ❗\n'
-        'В городе участились случаи обнаружения поддельных купюр.\n'
-        'Разыскивается главарь банды фальшивомонетчиков по кличке Маляр 🚓.\n'
-        'Особые приметы: утка.\n'
-        'The End!'
-    )
+STORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'omd_story.json')
+PROMPT = 'Выберите: '
+
+
+class StoryNode:
+    """Узел истории с заранее собранными текстом, подсказкой и таблицей переходов"""
+    __slots__ = ('name', 'text', 'template', 'prompt', 'options', 'next')
+
+    def __init__(self, name, raw):
+        self.name = name
+        self.text = raw['text']
+        self.template = [field for _, field, _, _ in string.Formatter().parse(self.text) if field is not None]
+        self.prompt = PROMPT + '/'.join(raw['options']) if raw.get('options') else None
+        self.options = {}
+        for option, target in raw.get('options', {}).items():
+            if isinstance(target, str):
+                target = {'next': target}
+            self.options[option.lower()] = (target.get('next'), dict(target.get('set', {})))
+        self.next = raw.get('next')
+        if self.options and self.next is not None:
+            raise ValueError(f'Node {name!r} has both options and next')
+
+    def render(self, variables):
+        return self.text.format_map(variables) if self.template else self.text
+
+
+class StoryGraph:
+    """
+    История в виде графа: у узла есть текст и варианты ответа, переход next
+    или ни того, ни другого в концовке. Вариант ответа ведет в узел и может
+    задавать переменные, которые подставляются в тексты как {name}
+    """
+    def __init__(self, data):
+        nodes = data.get('nodes')
+        if not isinstance(nodes, dict) or not nodes:
+            raise ValueError('Story must have non-empty nodes')
+        if data.get('start') not in nodes:
+            raise ValueError(f'Unknown start node: {data.get("start")!r}')
+        self.nodes = {name: StoryNode(name, raw) for name, raw in nodes.items()}
+        self._link()
+        self.start = self.nodes[data['start']]
+
+    @classmethod
+    def from_file(cls, path=STORY_PATH):
+        with open(path, encoding='UTF-8') as file:
+            return cls(json.load(file))
+
+    def _link(self):
+        """Проверка ссылок и переменных, замена имен узлов на сами узлы"""
+        variables = {name for node in self.nodes.values()
+                     for _, assignments in node.options.values() for name in assignments}
+        for node in self.nodes.values():
+            targets = [target for target, _ in node.options.values()]
+            for target in targets + ([node.next] if node.next is not None else []):
+                if target not in self.nodes:
+                    raise ValueError(f'Node {node.name!r} leads to unknown node {target!r}')
+            for field in node.template:
+                if field not in variables:
+                    raise ValueError(f'Node {node.name!r} uses unknown variable {field!r}')
+        for node in self.nodes.values():
+            node.next = self.nodes.get(node.next)
+            node.options = {option: (self.nodes[target], assignments)
+                            for option, (target, assignments) in node.options.items()}
+
+        checked = set()
+        for node in self.nodes.values():
+            chain = set()
+            while node is not None and node.name not in checked:
+                if node.name in chain:
+                    raise ValueError(f'Nodes loop through next without options: {node.name!r}')
+                chain.add(node.name)
+                node = node.next
+            checked |= chain
+
+
+class StorySession:
+    """Прохождение истории: start и feed возвращают строки, которые нужно вывести"""
+    __slots__ = ('graph', 'node', 'vars')
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.node = None
+        self.vars = {}
+
+    @property
+    def finished(self):
+        return self.node is not None and not self.node.options
+
+    def start(self):
+        self.vars = {}
+        return self._enter(self.graph.start)
+
+    def feed(self, answer):
+        """
+        Ответ на текущий вопрос
+        :param answer: введенный вариант, регистр не важен
+        :return: строки для вывода, при неверном ответе только подсказка
+        """
+        if self.node is None or self.finished:
+            raise ValueError('Story is not waiting for an answer')
+        choice = self.node.options.get(answer.lower())
+        if choice is None:
+            return [self.node.prompt]
+        node, assignments = choice
+        self.vars.update(assignments)
+        return self._enter(node)
+
+    def _enter(self, node):
+        """Проход по переходам next до вопроса или концовки"""
+        lines = [node.render(self.vars)]
+        while node.next is not None:
+            node = node.next
+            lines.append(node.render(self.vars))
+        self.node = node
+        if node.options:
+            lines.append(node.prompt)
+        return lines
+
+
+def run_story(graph=None, stdin=None, stdout=None):
+    """
+    Прохождение истории без рекурсии, по умолчанию интерактивное
+    :param graph: история, по умолчанию из STORY_PATH
+    :param stdin: поток с ответами, по одному в строке
+    :param stdout: поток для текста истории, одна запись на шаг
+    :return: переменные истории или None, если ответы закончились раньше концовки
+    """
+    graph = graph or StoryGraph.from_file()
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    session = StorySession(graph)
+    lines = session.start()
+    while True:
+        stdout.write(_text(lines))
+        stdout.flush()
+        if session.finished:
+            return session.vars
+        answer = stdin.readline()
+        if not answer:
+            return None
+        lines = session.feed(answer.strip())
+
+
+def iter_paths(graph=None):
+    """
+    Все пути по истории. Путь не заходит дважды в один и тот же вопрос,
+    поэтому перебор конечен и для историй с циклами
+    :param graph: история, по умолчанию из STORY_PATH
+    :return: итератор кортежей ответов, которые приводят к концовке
+    """
+    graph = graph or StoryGraph.from_file()
+    stack = [(_settle(graph.start), (), frozenset())]
+    while stack:
+        node, answers, visited = stack.pop()
+        if not node.options:
+            yield answers
+            continue
+        visited |= {node}
+        for option, (target, _) in reversed(node.options.items()):
+            target = _settle(target)
+            if target not in visited:
+                stack.append((target, answers + (option,), visited))
+
+
+def _settle(node):
+    """Узел, на котором остановится сессия после переходов next"""
+    while node.next is not None:
+        node = node.next
+    return node
+
+
+class StoryServer:
+    """
+    Сервер на asyncio, который ведет много сессий истории в одном цикле событий.
+    Протокол построчный в UTF-8: клиент отправляет ответ, сервер выводит строки
+    до подсказки PROMPT, а после концовки закрывает соединение
+    """
+    LATENCY_WINDOW = 10000
+
+    def __init__(self, graph=None):
+        self.graph = graph or StoryGraph.from_file()
+        self.started_at = time.perf_counter()
+        self.sessions = 0
+        self.finished = 0
+        self.active = 0
+        self.steps = 0
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    async def start(self, host='127.0.0.1', port=0, path=None, backlog=4096):
+        """
+        Запуск сервера на TCP или на Unix-сокете, если задан path
+        :param backlog: очередь подключений, при тысячах одновременных игроков
+        стандартных 100 не хватает
+        :return: asyncio.Server
+        """
+        self.started_at = time.perf_counter()
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path, backlog=backlog)
+        return await asyncio.start_server(self.handle, host, port, backlog=backlog)
+
+    async def handle(self, reader, writer):
+        session = StorySession(self.graph)
+        self.sessions += 1
+        self.active += 1
+        try:
+            writer.write(_encode(session.start()))
+            await writer.drain()
+            while not session.finished:
+                answer = await reader.readline()
+                if not answer:
+                    break
+                begin = time.perf_counter()
+                writer.write(_encode(session.feed(answer.decode('UTF-8').strip())))
+                self.latencies.append(time.perf_counter() - begin)
+                self.steps += 1
+                await writer.drain()
+            else:
+                self.finished += 1
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+
+    def metrics(self):
+        """Счетчики сессий и задержка шага по последним LATENCY_WINDOW шагам, в микросекундах"""
+        elapsed = time.perf_counter() - self.started_at
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1e6 if latencies else 0.0
+        return {
+            'sessions': self.sessions,
+            'finished': self.finished,
+            'active': self.active,
+            'steps': self.steps,
+            'sessions_per_second': self.finished / elapsed if elapsed else 0.0,
+            'step_p50_us': percentile(0.5),
+            'step_p99_us': percentile(0.99),
+            'step_max_us': latencies[-1] * 1e6 if latencies else 0.0,
+        }
+
+
+def _text(lines):
+    return ''.join(line + '\n' for line in lines)
+
+
+def _encode(lines):
+    return _text(lines).encode('UTF-8')
+
+
+async def simulate_clients(n_sessions, host='127.0.0.1', port=None, path=None, concurrency=100, seed=0):
+    """
+    Клиенты, которые проходят историю, выбирая случайные варианты ответа
+    :param n_sessions: сколько сессий пройти
+    :param concurrency: сколько сессий идет одновременно
+    :return: число пройденных до конца сессий
+    """
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def play():
+        async with limit:
+            if path is not None:
+                reader, writer = await asyncio.open_unix_connection(path)
+            else:
+                reader, writer = await asyncio.open_connection(host, port)
+            try:
+                async for line in reader:
+                    line = line.decode('UTF-8')
+                    if line.startswith(PROMPT):
+                        options = line[len(PROMPT):].strip().split('/')
+                        writer.write((rng.choice(options) + '\n').encode('UTF-8'))
+                    elif line.rstrip('\n').endswith('The End!'):
+                        return True
+                return False
+            finally:
+                writer.close()
+
+    results = await asyncio.gather(*(play() for _ in range(n_sessions)))
+    return sum(results)
+
+
+async def _serve(args):
+    server = StoryServer()
+    listener = await server.start(args.host, args.port, args.unix)
+    address = args.unix or '{}:{}'.format(*listener.sockets[0].getsockname()[:2])
+    async with listener:
+        if args.simulate:
+            completed = await simulate_clients(args.simulate, args.host, listener.sockets[0].getsockname()[1],
+                                               args.unix, args.concurrency)
+            print(f'Завершено сессий: {completed}/{args.simulate}')
+            print(json.dumps(server.metrics(), indent=2))
+            return
+        print(f'История доступна на {address}')
+        while True:
+            await asyncio.sleep(args.report)
+            print(json.dumps(server.metrics()))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='История про утку-маляра')
+    parser.add_argument('--serve', action='store_true', help='запустить сервер для многих игроков')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8023)
+    parser.add_argument('--unix', help='путь к Unix-сокету вместо TCP')
+    parser.add_argument('--report', type=float, default=10.0, help='период вывода метрик, секунды')
+    parser.add_argument('--simulate', type=int, default=0, help='прогнать столько локальных клиентов и выйти')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--self-test', action='store_true', help='проверить движок на всех путях истории')
+    args = parser.parse_args(argv)
+    if args.self_test:
+        _self_test()
+        return
+    if args.simulate:
+        args.port = 0 if args.unix is None else args.port
+    if args.serve or args.simulate:
+        try:
+            asyncio.run(_serve(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        run_story()
+
+
+def _self_test():
+    """Проверка движка истории и прохождение всех путей без терминала"""
+    import io
+
+    session = StorySession(StoryGraph.from_file())
+    assert session.start()[-1] == 'Выберите: да/нет'
+    assert session.feed('может') == ['Выберите: да/нет']
+    assert session.feed('НЕТ')[-1] == 'Выберите: виски/шампанское/пиво'
+    assert session.feed('пиво')[0].startswith('Пиво понравилось утке.')
+    assert session.feed('да')[-1].endswith('The End!') and session.finished
+    try:
+        StoryGraph({'start': 'a', 'nodes': {'a': {'text': '', 'next': 'b'}, 'b': {'text': '', 'next': 'a'}}})
+    except ValueError:
+        pass
+    else:
+        assert False, 'loops through next must be rejected'
+    paths = list(iter_paths())
+    assert len(paths) == 12 and paths[0] == ('да', 'виски', 'да')
+    for path in paths:
+        output = io.StringIO()
+        assert run_story(stdin=io.StringIO('\n'.join(path) + '\n'), stdout=output)['drink'] == path[1].capitalize()
+        assert output.getvalue().endswith('The End!\n')
+    assert run_story(stdin=io.StringIO('да\n'), stdout=io.StringIO()) is None
+    print('Все проверки пройдены.')
 
 
 if __name__ == '__main__':
-    step1()
+    main(sys.argv[1:])